@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        import api.signals  # noqa: F401
+        from api import pdf
+        from api.mixins import check_conditional_cache
+
+        pdf.register_fonts()
+        if settings.CONDITIONAL_RESPONSES:
+            check_conditional_cache()
@@ -0,0 +1,116 @@
+"""Экспортеры списка покупок.
+
+Экспортер - это рендерер DRF, поэтому формат выбирается стандартным
+согласованием по ?format= или заголовку Accept. Экспортеры собраны в
+реестре EXPORTERS в порядке регистрации, первый используется по
+умолчанию. Текстовые форматы отдают строки по мере чтения кверисета.
+"""
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+from api.pdf import render_pdf
+
+EXPORTERS = {}
+
+
+def register_exporter(exporter):
+    """Добавляем экспортер в реестр по его формату"""
+
+    EXPORTERS[exporter.format] = exporter
+    return exporter
+
+
+class ShoppingListExporter(BaseRenderer):
+    """Базовый экспортер: stream отдает файл частями из строк
+    (название, ед. измерения, количество)"""
+
+    charset = 'utf-8'
+
+    def stream(self, ingredients):
+        raise NotImplementedError(
+            'Экспортер должен реализовать метод stream()'
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.stream(data))
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    @property
+    def filename(self):
+        return f'shopping_list.{self.format}'
+
+
+@register_exporter
+class PdfExporter(ShoppingListExporter):
+    """Список покупок в pdf"""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, ingredients):
+        return render_pdf(ingredients)
+
+
+@register_exporter
+class TextExporter(ShoppingListExporter):
+    """Список покупок простым текстом"""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Список ингредиентов для рецептов\n'.encode(self.charset)
+        for ingredient_name, measurement_unit, amount in ingredients:
+            yield (
+                f'• {ingredient_name} - {amount} {measurement_unit}\n'
+            ).encode(self.charset)
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+@register_exporter
+class CsvExporter(ShoppingListExporter):
+    """Список покупок в csv"""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('name', 'measurement_unit', 'amount')
+        ).encode(self.charset)
+        for row in ingredients:
+            yield writer.writerow(row).encode(self.charset)
+
+
+@register_exporter
+class JsonExporter(ShoppingListExporter):
+    """Список покупок в json"""
+
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient_name, measurement_unit, amount in ingredients:
+            yield (separator + json.dumps({
+                'name': ingredient_name,
+                'measurement_unit': measurement_unit,
+                'amount': amount
+            }, ensure_ascii=False)).encode(self.charset)
+            separator = ','
+        yield ('[]' if separator == '[' else ']').encode(self.charset)
@@ -0,0 +1,124 @@
+"""Поля сериализаторов.
+
+Base64ImageField декодирует картинку частями во временный файл, который
+держится в памяти только до IMAGE_UPLOAD_SPOOL_SIZE. Размер файла
+проверяется по длине строки до декодирования, а размеры картинки - по
+заголовку до распаковки пикселей, поэтому большая или сжатая "бомба"
+отклоняется, не занимая память воркера.
+"""
+import base64
+import binascii
+import re
+import warnings
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+DATA_URL = re.compile(r'^data:(image/[\w.+-]+);base64,')
+WHITESPACE = re.compile(r'\s+')
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'GIF': ('gif', 'image/gif'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+class Base64ImageField(serializers.ImageField):
+    """Картинка в base64 с ограничениями размера файла и картинки"""
+
+    default_error_messages = {
+        'invalid_base64': 'Картинка должна быть строкой в base64.',
+        'invalid_image': 'Загрузите корректную картинку.',
+        'invalid_format': 'Допустимые форматы картинки: {formats}.',
+        'max_size': 'Размер картинки больше {max_size} байт.',
+        'max_side': 'Сторона картинки больше {max_side} пикселей.',
+        'max_pixels': 'В картинке больше {max_pixels} пикселей.',
+    }
+
+    def __init__(self, max_size=None, max_side=None, max_pixels=None,
+                 **kwargs):
+        self.max_size = max_size
+        self.max_side = max_side
+        self.max_pixels = max_pixels
+        super().__init__(**kwargs)
+
+    def get_limits(self):
+        return (
+            self.max_size or settings.IMAGE_UPLOAD_MAX_SIZE,
+            self.max_side or settings.IMAGE_UPLOAD_MAX_SIDE,
+            self.max_pixels or settings.IMAGE_UPLOAD_MAX_PIXELS,
+        )
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        match = DATA_URL.match(data)
+        encoded = data[match.end():] if match else data
+        if WHITESPACE.search(encoded):
+            encoded = WHITESPACE.sub('', encoded)
+        max_size, max_side, max_pixels = self.get_limits()
+        if len(encoded) // 4 * 3 - encoded[-2:].count('=') > max_size:
+            self.fail('max_size', max_size=max_size)
+        file = SpooledTemporaryFile(max_size=settings.IMAGE_UPLOAD_SPOOL_SIZE)
+        try:
+            self.decode(encoded, file)
+            image_format = self.check_image(file, max_side, max_pixels)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        size = file.tell()
+        file.seek(0)
+        extension, content_type = IMAGE_FORMATS[image_format]
+        return UploadedFile(
+            file, name=f'{uuid4().hex}.{extension}',
+            content_type=content_type, size=size
+        )
+
+    def decode(self, encoded, file):
+        """Декодируем base64 частями по IMAGE_UPLOAD_CHUNK_SIZE символов"""
+
+        chunk_size = settings.IMAGE_UPLOAD_CHUNK_SIZE // 4 * 4
+        if not encoded or len(encoded) % 4:
+            self.fail('invalid_base64')
+        try:
+            for start in range(0, len(encoded), chunk_size):
+                file.write(base64.b64decode(
+                    encoded[start:start + chunk_size], validate=True
+                ))
+        except (binascii.Error, ValueError):
+            self.fail('invalid_base64')
+
+    def check_image(self, file, max_side, max_pixels):
+        """Проверяем формат и размеры по заголовку картинки"""
+
+        file.seek(0)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                image = Image.open(file)
+                width, height = image.size
+                frames = getattr(image, 'n_frames', 1)
+                image_format = image.format
+        except (
+            UnidentifiedImageError, OSError,
+            Image.DecompressionBombWarning, Image.DecompressionBombError
+        ):
+            self.fail('invalid_image')
+        if image_format not in IMAGE_FORMATS:
+            self.fail('invalid_format', formats=', '.join(IMAGE_FORMATS))
+        if max(width, height) > max_side:
+            self.fail('max_side', max_side=max_side)
+        if width * height * frames > max_pixels:
+            self.fail('max_pixels', max_pixels=max_pixels)
+        file.seek(0)
+        try:
+            Image.open(file).verify()
+        except Exception:
+            self.fail('invalid_image')
+        file.seek(0, 2)
+        return image_format
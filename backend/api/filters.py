@@ -1,30 +1,111 @@
-from django_filters import NumberFilter
+from django import forms
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
+from django_filters import CharFilter, ChoiceFilter, NumberFilter
 from django_filters import rest_framework as filters
 from django_filters.rest_framework import FilterSet
-from rest_framework.filters import SearchFilter
+from django_filters.widgets import QueryArrayWidget
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Recipes
+from recipes import autocomplete, reference, search
+from recipes.models import Recipes, Tags
 from users.models import User
 
 
-class IngredientsFilter(SearchFilter):
-    """Полнотекстовый поиск по ингредиентам"""
-
-    def get_search_fields(self, view, request):
-        if request.query_params.get('name'):
-            return ['name']
-        return super().get_search_fields(view, request)
+class IngredientsFilter(BaseFilterBackend):
+    """Автодополнение ингредиентов по началу и части названия"""
 
     search_param = 'name'
+    limit_param = 'limit'
+
+    def get_limit(self, request):
+        limit = request.query_params.get(self.limit_param, '')
+        if not limit.isdigit() or not int(limit):
+            return settings.INGREDIENTS_AUTOCOMPLETE_LIMIT
+        return min(int(limit), settings.INGREDIENTS_AUTOCOMPLETE_MAX_LIMIT)
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name or view.action != 'list':
+            return queryset
+        return autocomplete.search(name, self.get_limit(request))
+
+
+class SlugListField(forms.Field):
+    """Список slug из ?tags=a&tags=b, ?tags[]=a или ?tags=a,b"""
+
+    widget = QueryArrayWidget
+
+    def to_python(self, value):
+        return list(dict.fromkeys(
+            slug.strip() for item in value or () for slug in item.split(',')
+            if slug.strip()
+        ))
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
+
+
+def get_tag_ids(slugs):
+    """id тегов по slug из снимка справочника, неизвестные пропускаем"""
+
+    tag_ids = reference.get(Tags).derive('slugs', lambda data: {
+        record['slug']: record['id'] for record in data.records
+    })
+    return {tag_ids[slug] for slug in slugs if slug in tag_ids}
+
+
+def filter_any_tags(queryset, tag_ids):
+    """Рецепты хотя бы с одним из тегов: EXISTS без JOIN и DISTINCT"""
+
+    return queryset.filter(Exists(Recipes.tags.through.objects.filter(
+        recipes_id=OuterRef('pk'), tags_id__in=tag_ids
+    )))
+
+
+def filter_all_tags(queryset, tag_ids):
+    """Рецепты со всеми тегами: id из сгруппированного подзапроса"""
+
+    return queryset.filter(id__in=Recipes.tags.through.objects.filter(
+        tags_id__in=tag_ids
+    ).values('recipes_id').annotate(
+        tags_count=Count('id')
+    ).filter(tags_count=len(tag_ids)).values('recipes_id'))
 
 
 class RecipesFilterSet(FilterSet):
-    """Фильтр рецептов по тегам, авторам, избранному, подпискам"""
+    """Фильтр рецептов по тегам, авторам, избранному, подпискам, тексту"""
+
+    TAGS_ANY = 'any'
+    TAGS_ALL = 'all'
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = SlugListFilter(method='filter_tags')
+    tags_mode = ChoiceFilter(
+        choices=((TAGS_ANY, 'Любой из тегов'), (TAGS_ALL, 'Все теги')),
+        method='filter_tags_mode'
+    )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = NumberFilter(method='filter_shopping_cart')
+    search = CharFilter(method='filter_search')
+
+    def filter_tags(self, queryset, name, slugs):
+        """Фильтрация по тегам: любой из них или все (tags_mode=all)"""
+
+        tag_ids = get_tag_ids(slugs)
+        if self.form.cleaned_data.get('tags_mode') == self.TAGS_ALL:
+            if len(tag_ids) < len(set(slugs)):
+                return queryset.none()
+            return filter_all_tags(queryset, tag_ids)
+        if not tag_ids:
+            return queryset.none()
+        return filter_any_tags(queryset, tag_ids)
+
+    def filter_tags_mode(self, queryset, name, mode):
+        """Режим применяется в filter_tags"""
+
+        return queryset
 
     def filter_is_favorited(self, queryset, is_favorited, number):
         """Фильтрация по избранному"""
@@ -40,6 +121,16 @@ class RecipesFilterSet(FilterSet):
             return queryset.filter(cart__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, query):
+        """Полнотекстовый поиск, результаты по убыванию релевантности"""
+
+        if not query.strip():
+            return queryset
+        return search.search(queryset, query)
+
     class Meta:
         model = Recipes
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'tags_mode', 'author', 'is_favorited',
+            'is_in_shopping_cart', 'search'
+        )
@@ -0,0 +1,76 @@
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.core.management import BaseCommand
+from django.http import HttpResponse
+
+from api.exporters import PdfExporter
+from api.pdf import write_pdf
+from api.utils import download_shopping_list
+
+
+def make_ingredients(count):
+    """Синтетический список покупок из count строк"""
+
+    return (
+        (f'Ингредиент {number}', 'г', number) for number in range(count)
+    )
+
+
+def buffered_pdf(ingredients):
+    """Прежний способ: весь pdf в BytesIO и копия в HttpResponse"""
+
+    buffer = BytesIO()
+    write_pdf(ingredients, buffer)
+    response = HttpResponse(content_type='application/pdf')
+    response.write(buffer.getvalue())
+    buffer.close()
+    return response
+
+
+def chunked_pdf(ingredients):
+    """Текущий способ: готовый pdf частями через StreamingHttpResponse"""
+
+    return download_shopping_list(PdfExporter(), ingredients)
+
+
+class Command(BaseCommand):
+    help = ("Сравнение пикового потребления памяти и времени до первого "
+            "байта при отдаче pdf списка покупок."
+            "Запуск: python manage.py bench_shopping_pdf [--sizes N ...].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+            help='Число строк в списке покупок'
+        )
+
+    def measure(self, render, count):
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks = iter(render(make_ingredients(count)))
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - start
+        for chunk in chunks:
+            size += len(chunk)
+        total = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return first_byte, total, peak, size
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"строк":>7} {"способ":>10} {"TTFB, мс":>10} '
+            f'{"всего, мс":>10} {"пик, КБ":>10} {"размер, КБ":>11}'
+        )
+        for count in options['sizes']:
+            for name, render in (
+                ('buffered', buffered_pdf), ('chunked', chunked_pdf)
+            ):
+                first_byte, total, peak, size = self.measure(render, count)
+                self.stdout.write(
+                    f'{count:>7} {name:>10} {first_byte * 1000:>10.1f} '
+                    f'{total * 1000:>10.1f} {peak / 1024:>10.0f} '
+                    f'{size / 1024:>11.0f}'
+                )
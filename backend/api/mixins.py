@@ -1,13 +1,34 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from api import versions
+from recipes import reference
 from users.models import Subscribe
 
 
-def check_request_return_boolean(self, obj, model):
-    """Проверяем, что запрос есть, юзер не аноним и возвращаем булевую"""
+def check_request_return_boolean(self, obj, model, annotation=None):
+    """Проверяем, что запрос есть, юзер не аноним и возвращаем булевую
+
+    Если объект уже аннотирован флагом в кверисете, берем его без запроса.
+    """
 
+    if annotation and hasattr(obj, annotation):
+        return getattr(obj, annotation)
     request = self.context.get('request')
     if not request or request.user.is_anonymous:
         return False
@@ -33,15 +54,187 @@ class FavoriteCart:
                     status=status.HTTP_400_BAD_REQUEST
                 )
             obj = get_object_or_404(self.add_model, id=obj_id)
-            model.objects.create(user=user, recipe=obj)
+            with transaction.atomic():
+                model.objects.create(user=user, recipe=obj)
             return Response(
                 self.add_serializer(obj).data, status=status.HTTP_201_CREATED
 
             )
         if obj.exists():
-            obj.delete()
+            with transaction.atomic():
+                obj.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': errors.get('if_deleted')},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+def check_conditional_cache():
+    """Валидаторам нужен общий для воркеров кеш версий
+
+    С локальным кешем воркер, не обработавший запись, хранит старую
+    версию таблицы или справочника и отвечает 304 на устаревший ETag.
+    """
+
+    for alias in {
+        settings.TABLE_VERSIONS_CACHE_ALIAS, settings.REFERENCE_CACHE_ALIAS
+    }:
+        if isinstance(caches[alias], (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                f'CONDITIONAL_RESPONSES требует общего бэкенда кеша, '
+                f'кеш {alias} - {type(caches[alias]).__name__}'
+            )
+
+
+def make_etag(*parts, weak=False):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def conditional(request, etag, last_modified, get_response):
+    """Отвечаем 304, если у клиента актуальная версия, иначе get_response()
+
+    Валидаторы добавляются в ответ, ответ зависит от пользователя, поэтому
+    в Vary добавляется Authorization.
+    """
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    ) or get_response()
+    if response.status_code in (status.HTTP_200_OK,
+                                status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalMixin:
+    """ETag и Last-Modified для списка и объекта с полем updated_at
+
+    Версия объекта - его updated_at, версия списка - последний updated_at
+    в отфильтрованном наборе. К ним добавляются версии таблиц
+    conditional_models, от которых зависит представление (сама модель для
+    удалений, автор, теги, флаги пользователя). Совпавший запрос получает
+    304 одним запросом к базе, до выборки связей и сериализации.
+    Валидаторы включает CONDITIONAL_RESPONSES, версии таблиц должны лежать
+    в общем кеше (check_conditional_cache).
+    """
+
+    conditional_models = ()
+
+    def get_validators(self, request, updated_at, weak=False):
+        table_versions = versions.get_versions(
+            [model._meta.db_table for model in self.conditional_models]
+        )
+        etag = make_etag(
+            request.user.pk, request.get_full_path(), updated_at,
+            table_versions, weak=weak
+        )
+        last_modified = max([
+            updated_at.timestamp() if updated_at else 0, *table_versions
+        ])
+        return etag, int(last_modified)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.CONDITIONAL_RESPONSES:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        updated_at = self.queryset.filter(
+            pk__in=queryset.values('pk')
+        ).aggregate(updated_at=Max('updated_at'))['updated_at']
+        etag, last_modified = self.get_validators(
+            request, updated_at, weak=True
+        )
+        return conditional(
+            request, etag, last_modified,
+            lambda: self.get_list_response(queryset)
+        )
+
+    def get_list_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_serializer(queryset, many=True).data)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.CONDITIONAL_RESPONSES:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            updated_at = self.queryset.filter(**{
+                self.lookup_field: kwargs[lookup_url_kwarg]
+            }).values_list('updated_at', flat=True).first()
+        except (ValueError, TypeError, ValidationError):
+            updated_at = None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request, updated_at)
+        return conditional(
+            request, etag, last_modified,
+            lambda: super(ConditionalMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+
+class ReferenceListMixin:
+    """Список справочника из кеша готовым JSON
+
+    Без параметров фильтрации список не читается из базы и не
+    сериализуется заново, а отдается байтами из снимка справочника.
+    ETag ответов - хеш снимка, снятый при его загрузке, поэтому
+    перечитанный снимок получает новый ETag. 304 отдается без обращения к
+    базе.
+    """
+
+    reference_filter_params = ()
+
+    def get_etag(self, request, weak=False):
+        return make_etag(
+            reference.get(self.queryset.model).digest,
+            request.get_full_path(), weak=weak
+        )
+
+    def list(self, request, *args, **kwargs):
+        filtered = any(
+            param in request.query_params
+            for param in self.reference_filter_params
+        )
+        if not settings.CONDITIONAL_RESPONSES:
+            if filtered:
+                return super().list(request, *args, **kwargs)
+            return self.reference_response()
+        if filtered:
+            return conditional(
+                request, self.get_etag(request, weak=True), None,
+                lambda: super(ReferenceListMixin, self).list(
+                    request, *args, **kwargs
+                )
+            )
+        return conditional(
+            request, self.get_etag(request), None, self.reference_response
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.CONDITIONAL_RESPONSES:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional(
+            request, self.get_etag(request), None,
+            lambda: super(ReferenceListMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+    def reference_response(self):
+        content = reference.get(self.queryset.model).derive(
+            'json', lambda data: JSONRenderer().render(
+                self.get_serializer(data.records, many=True).data
+            )
+        )
+        return HttpResponse(content, content_type='application/json')
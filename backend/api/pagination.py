@@ -0,0 +1,137 @@
+"""Пагинация списков.
+
+По умолчанию списки разбиваются на страницы с номерами. С параметром
+?pagination=cursor используется курсорная пагинация по -id: без COUNT и
+OFFSET, со ссылками next и previous с непрозрачным курсором. Фильтры
+сохраняются в ссылках вместе с остальными параметрами запроса. Курсор
+задает свою сортировку, поэтому с полнотекстовым поиском (?search=)
+параметр pagination игнорируется и остаются страницы с номерами, чтобы
+не терять сортировку по релевантности.
+
+Общее число записей для страниц с номерами кешируется на
+PAGINATION_COUNT_TIMEOUT по SQL запроса без сортировки и аннотаций, то
+есть по набору фильтров, и версиям таблиц из запроса и его подзапросов
+(api.versions).
+Для списков без фильтров на
+PostgreSQL вместо COUNT берется оценка reltuples, если она больше
+PAGINATION_COUNT_ESTIMATE_THRESHOLD.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+
+from api import versions
+
+
+def get_cache():
+    return caches[settings.PAGINATION_COUNT_CACHE_ALIAS]
+
+
+def count_key(queryset):
+    """Ключ кеша по SQL запроса id без сортировки и версиям его таблиц
+
+    Учитываются и таблицы подзапросов, например связь с тегами в фильтре.
+    """
+
+    query = queryset.order_by().values('pk').query
+    sql, params = query.sql_with_params()
+    tables = sorted(versions.get_query_tables(query))
+    digest = hashlib.sha1(
+        f'{sql}{params!r}{versions.get_versions(tables)!r}'.encode()
+    ).hexdigest()
+    return f'pagination:count:{queryset.db}:{digest}'
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике PostgreSQL"""
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row and row[0] > settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+        return row[0]
+    return None
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с кешированным или оценочным числом записей"""
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        cache = get_cache()
+        try:
+            key = count_key(self.object_list)
+        except EmptyResultSet:
+            return 0
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(self.object_list)
+            if count is None:
+                count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_TIMEOUT)
+        return count
+
+
+class CachedCountPageNumberPagination(PageNumberPagination):
+    """Страницы с номерами и кешированным count"""
+
+    django_paginator_class = CachedCountPaginator
+
+
+class IdCursorPagination(CursorPagination):
+    """Курсорная пагинация по убыванию id"""
+
+    ordering = '-id'
+
+
+class PageNumberOrCursorPagination(BasePagination):
+    """Пагинация страницами или курсором по параметру pagination"""
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    ranked_query_params = ('search',)
+    page_number_class = CachedCountPageNumberPagination
+    cursor_class = IdCursorPagination
+
+    def get_paginator(self, request):
+        """Курсор по запросу, кроме списков со своей сортировкой"""
+
+        if request.query_params.get(
+            self.mode_query_param
+        ) == self.cursor_mode and not any(
+            request.query_params.get(param, '').strip()
+            for param in self.ranked_query_params
+        ):
+            return self.cursor_class()
+        return self.page_number_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *self.page_number_class().get_schema_operation_parameters(view),
+            *self.cursor_class().get_schema_operation_parameters(view),
+        ]
@@ -0,0 +1,98 @@
+"""Отрисовка списка покупок в pdf.
+
+Шрифты регистрируются один раз на процесс при старте приложения
+(ApiConfig.ready), раскладка шапки документа считается один раз и
+кешируется. warm_up прогревает отрисовку до первого запроса.
+
+reportlab собирает документ целиком в canvas.save(), поэтому pdf не
+отдается по мере отрисовки: первый байт уходит после отрисовки всего
+списка, а пик памяти тот же, что у буфера в памяти.
+"""
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.rl_config import defaultPageSize
+
+PAGE_WIDTH = defaultPageSize[0]
+LINE_HEIGHT = 20
+LINE_FONT_SIZE = 16
+LINE_LEFT = 50
+FIRST_PAGE_TOP = 700
+PAGE_TOP = 800
+PAGE_BOTTOM = 50
+HEADER = (
+    (24, 800, 'Рецепты с сайта Foodgram'),
+    (20, 750, 'Список ингредиентов для рецептов'),
+)
+
+
+def register_fonts():
+    """Регистрируем шрифт pdf, если он еще не зарегистрирован"""
+
+    if settings.PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(settings.PDF_FONT_NAME, settings.PDF_FONT_PATH, 'UTF-8')
+        )
+
+
+@lru_cache(maxsize=None)
+def get_header_layout():
+    """Раскладка шапки: (размер шрифта, x, y, текст) с центровкой строк"""
+
+    register_fonts()
+    return tuple(
+        (size, (PAGE_WIDTH - pdfmetrics.stringWidth(
+            text, settings.PDF_FONT_NAME, size
+        )) / 2, height, text)
+        for size, height, text in HEADER
+    )
+
+
+def write_pdf(ingredients, buffer):
+    """Рисуем список покупок в pdf, перенося строки на новые страницы"""
+
+    page = canvas.Canvas(buffer)
+    for size, left, height, text in get_header_layout():
+        page.setFont(settings.PDF_FONT_NAME, size=size)
+        page.drawString(left, height, text)
+    page.setFont(settings.PDF_FONT_NAME, size=LINE_FONT_SIZE)
+    height = FIRST_PAGE_TOP
+    for ingredient_name, measurement_unit, amount in ingredients:
+        if height < PAGE_BOTTOM:
+            page.showPage()
+            page.setFont(settings.PDF_FONT_NAME, size=LINE_FONT_SIZE)
+            height = PAGE_TOP
+        page.drawString(
+            LINE_LEFT, height,
+            f'• {ingredient_name} - {amount} {measurement_unit}'
+        )
+        height -= LINE_HEIGHT
+
+    page.showPage()
+    page.save()
+
+
+def render_pdf(ingredients):
+    """Генератор готового pdf списка покупок частями по PDF_CHUNK_SIZE
+
+    Части нужны для общего интерфейса экспортеров, документ при этом уже
+    целиком отрисован в памяти.
+    """
+
+    buffer = BytesIO()
+    write_pdf(ingredients, buffer)
+    content = buffer.getbuffer()
+    for start in range(0, len(content), settings.PDF_CHUNK_SIZE):
+        yield bytes(content[start:start + settings.PDF_CHUNK_SIZE])
+
+
+def warm_up():
+    """Прогреваем шрифты, шапку и отрисовку до первого запроса"""
+
+    register_fonts()
+    get_header_layout()
+    write_pdf([('Foodgram', 'г', 1)], BytesIO())
@@ -1,12 +1,14 @@
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from django.db import transaction
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from api.fields import Base64ImageField
 from api.mixins import check_request_return_boolean
+from recipes import feed, images, minhash, search, shopping_list, tasks
 from recipes.models import (Cart, Favorite, IngredientInRecipe, Ingredients,
                             Recipes, Tags)
 from recipes.validators import validate_amount, validate_cooking_time
@@ -29,7 +31,9 @@ class CustomUserSerializer(UserSerializer):
     def get_is_subscribed(self, obj):
         """Получаем статус подписки на автора"""
 
-        if check_request_return_boolean(self, obj, Subscribe):
+        if check_request_return_boolean(
+                self, obj, Subscribe, 'is_subscribed'
+        ):
             return True
         return False
 
@@ -62,12 +66,33 @@ class CustomUserCreateSerializer(UserCreateSerializer, ValidateUsername):
         )
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии картинки рецепта по размерам и форматам
+
+    Пока копии не посчитаны, возвращается пустой словарь.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for name, formats in value.items():
+            urls[name] = {}
+            for image_format, path in formats.items():
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[name][image_format] = url
+        return urls
+
+
 class ShortSerializer(serializers.ModelSerializer):
     """Сериализатор короткого ответа рецептов для подписок и избранного"""
 
+    images = ImageVariantsField()
+
     class Meta:
         model = Recipes
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class SubscribeSerializer(serializers.ModelSerializer):
@@ -88,23 +113,30 @@ class SubscribeSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        """Получаем статус подписки на автора"""
+        """Получаем статус подписки на автора
+
+        Объект подписки сам по себе означает, что пользователь подписан.
+        """
 
-        return obj.user.follower.exists()
+        return True
 
     def get_recipes(self, obj):
-        """Получаем рецепты, на которые подписаны и ограничиваем по лимитам"""
+        """Получаем рецепты автора, на которого подписаны, с учетом лимита"""
 
-        queryset = Recipes.objects.filter(author__following__user=obj.user)
-        recipes_limit = self.context.get('request').GET.get('recipes_limit')
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
-        return ShortSerializer(queryset, many=True).data
+        recipes = getattr(obj.author, 'short_recipes', None)
+        if recipes is None:
+            recipes = obj.author.recipe_author.all()
+            recipes_limit = self.context.get('request').GET.get(
+                'recipes_limit', ''
+            )
+            if recipes_limit.isdigit():
+                recipes = recipes[:int(recipes_limit)]
+        return ShortSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        """Считаем рецепты автора, на которого подписан пользователь"""
+        """Число рецептов автора берем из счетчика"""
 
-        return obj.author.recipe_author.count()
+        return obj.author.recipes_count
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -147,13 +179,14 @@ class RecipesSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    search_snippet = serializers.SerializerMethodField()
     name = serializers.CharField(
         required=True, max_length=settings.RECIPE_NAME
     )
     image = Base64ImageField(
-        max_length=None, required=True,
-        allow_null=False, allow_empty_file=False
+        required=True, allow_null=False, allow_empty_file=False
     )
+    images = ImageVariantsField()
     text = serializers.CharField(required=True)
     cooking_time = serializers.IntegerField(
         required=True, validators=[validate_cooking_time]
@@ -163,41 +196,83 @@ class RecipesSerializer(serializers.ModelSerializer):
         model = Recipes
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'images', 'text',
+            'cooking_time', 'search_snippet'
+        )
+
+    def add_missing_errors(self, model, positions, errors, message):
+        """Одним запросом находим несуществующие id и добавляем ошибки"""
+
+        existing = set(model.objects.filter(
+            id__in=positions
+        ).values_list('id', flat=True))
+        for obj_id, index in positions.items():
+            if obj_id not in existing:
+                errors.setdefault(index, []).append(message.format(obj_id))
+
+    def check_ingredients(self, ingredients):
+        """Проверяем ингредиенты рецепта, собирая ошибки по позициям"""
+
+        if not ingredients or not isinstance(ingredients, list):
+            return [], ['Нужен хотя бы один ингредиент для рецепта']
+        items, errors, positions = [], {}, {}
+        for index, ingredient_item in enumerate(ingredients):
+            try:
+                ingredient_id = int(ingredient_item['id'])
+                amount = validate_amount(int(ingredient_item['amount']))
+            except (KeyError, TypeError, ValueError):
+                errors[index] = ['Нужны целые id и amount ингредиента']
+                continue
+            except DjangoValidationError as error:
+                errors[index] = error.messages
+                continue
+            if ingredient_id in positions:
+                errors[index] = ['Ингредиенты не должны повторяться']
+                continue
+            positions[ingredient_id] = index
+            items.append({'id': ingredient_id, 'amount': amount})
+        self.add_missing_errors(
+            Ingredients, positions, errors, 'Ингредиент {} не найден'
         )
+        return items, errors
+
+    def check_tags(self, tags):
+        """Проверяем теги рецепта, собирая ошибки по позициям"""
+
+        if not tags or not isinstance(tags, list):
+            return [], ['Нужен хотя бы один тэг для рецепта']
+        errors, positions = {}, {}
+        for index, tag_item in enumerate(tags):
+            try:
+                tag_id = int(tag_item)
+            except (TypeError, ValueError):
+                errors[index] = ['Нужен целый id тега']
+                continue
+            if tag_id in positions:
+                errors[index] = ['Теги в рецепте не должны повторяться']
+                continue
+            positions[tag_id] = index
+        self.add_missing_errors(Tags, positions, errors, 'Тег {} не найден')
+        return list(positions), errors
 
     def validate(self, data):
-        """Валидируем ингредиенты и теги"""
+        """Валидируем ингредиенты и теги
 
-        ingredients = self.initial_data.get('ingredients')
-        if not ingredients:
-            raise serializers.ValidationError(
-                {'ingredients': 'Нужен хотя бы один ингредиент для рецепта'}
-            )
-        ingredients_list = []
-        for ingredient_item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredients, id=ingredient_item['id']
-            )
-            if ingredient in ingredients_list:
-                raise serializers.ValidationError(
-                    {'ingredients': 'Ингредиенты не должны повторяться'}
-                )
-            validate_amount(int(ingredient_item['amount']))
-            ingredients_list.append(ingredient)
-        tags = self.initial_data.get('tags')
-        if not tags:
-            raise serializers.ValidationError(
-                {'tags': 'Нужен хотя бы один тэг для рецепта'}
-            )
-        tags_list = []
-        for tag_item in tags:
-            tag = get_object_or_404(Tags, id=tag_item)
-            if tag in tags_list:
-                raise serializers.ValidationError(
-                    {'tags': 'Теги в рецепте не должны повторяться'}
-                )
-            tags_list.append(tag)
+        Существование проверяется одним запросом id__in на список, ошибки
+        по всем позициям возвращаются разом.
+        """
+
+        ingredients, ingredients_errors = self.check_ingredients(
+            self.initial_data.get('ingredients')
+        )
+        tags, tags_errors = self.check_tags(self.initial_data.get('tags'))
+        errors = {}
+        if ingredients_errors:
+            errors['ingredients'] = ingredients_errors
+        if tags_errors:
+            errors['tags'] = tags_errors
+        if errors:
+            raise serializers.ValidationError(errors)
 
         data['author'] = self.context.get('request').user
         data['ingredients'] = ingredients
@@ -205,16 +280,61 @@ class RecipesSerializer(serializers.ModelSerializer):
         return data
 
     def create_ingredients(self, ingredients, recipe):
-        """Создаем связку ингредиентов для рецепта"""
-
-        for ingredient_item in ingredients:
-            IngredientInRecipe.objects.bulk_create(
-                [IngredientInRecipe(
-                    ingredient_id=ingredient_item['id'],
-                    recipe=recipe,
-                    amount=ingredient_item['amount']
-                )]
-            )
+        """Создаем связку ингредиентов для рецепта одной вставкой"""
+
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                ingredient_id=ingredient_item['id'],
+                recipe=recipe,
+                amount=ingredient_item['amount']
+            ) for ingredient_item in ingredients
+        ])
+
+    def update_ingredients(self, ingredients, recipe):
+        """Обновляем связку ингредиентов по разнице со старой
+
+        Не больше одного удаления, одного bulk_update и одной вставки,
+        неизмененные строки не трогаем. Удаленные строки убирают из списков
+        покупок сигналы, bulk-операции их не шлют, поэтому возвращаем старые
+        количества оставшихся ингредиентов {ingredient_id: amount}.
+        """
+
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(
+                recipe=recipe
+            ).only('id', 'ingredient_id', 'amount').order_by()
+        }
+        new_amounts = {item['id']: item['amount'] for item in ingredients}
+        removed = [
+            row.id for ingredient_id, row in existing.items()
+            if ingredient_id not in new_amounts
+        ]
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+        changed = [
+            IngredientInRecipe(id=existing[ingredient_id].id, amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id in existing
+            and existing[ingredient_id].amount != amount
+        ]
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients([
+            item for item in ingredients if item['id'] not in existing
+        ], recipe)
+        return {
+            ingredient_id: row.amount
+            for ingredient_id, row in existing.items()
+            if ingredient_id in new_amounts
+        }
+
+    def get_minhash(self, ingredients, tags):
+        """Получаем MinHash подпись по составу рецепта"""
+
+        return minhash.get_signature(minhash.get_features(
+            [item['id'] for item in ingredients], tags
+        ))
 
     @transaction.atomic
     def create(self, validated_data):
@@ -226,17 +346,29 @@ class RecipesSerializer(serializers.ModelSerializer):
         recipe = Recipes.objects.create(image=image, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        recipe.minhash = self.get_minhash(ingredients, tags)
         recipe.save()
+        minhash.save_buckets(recipe.id, recipe.minhash)
+        tasks.on_commit(images.make_variants, recipe.id)
+        tasks.on_commit(feed.fan_out, recipe.id)
         return recipe
 
     @transaction.atomic
     def update(self, recipe, validated_data):
         """Обновляем рецепт"""
 
-        recipe.ingredients.clear()
-        self.create_ingredients(validated_data.pop('ingredients'), recipe)
+        ingredients = validated_data.pop('ingredients')
+        old_amounts = self.update_ingredients(ingredients, recipe)
+        shopping_list.change_recipe(recipe.id, old_amounts, {
+            item['id']: item['amount'] for item in ingredients
+        })
         tags = validated_data.pop('tags')
         recipe.tags.set(tags)
+        validated_data['minhash'] = self.get_minhash(ingredients, tags)
+        minhash.save_buckets(recipe.id, validated_data['minhash'])
+        if 'image' in validated_data:
+            validated_data['images'] = {}
+            tasks.on_commit(images.make_variants, recipe.id)
         return super().update(recipe, validated_data)
 
     def delete(self, recipe):
@@ -245,14 +377,45 @@ class RecipesSerializer(serializers.ModelSerializer):
         recipe.delete()
 
     def get_is_favorited(self, obj):
+        """Получаем статус избранного"""
 
-        if check_request_return_boolean(self, obj, Favorite):
+        if check_request_return_boolean(self, obj, Favorite, 'is_favorited'):
             return True
         return False
 
     def get_is_in_shopping_cart(self, obj):
         """Получаем статус списка покупок"""
 
-        if check_request_return_boolean(self, obj, Cart):
+        if check_request_return_boolean(
+                self, obj, Cart, 'is_in_shopping_cart'
+        ):
             return True
         return False
+
+    def get_search_snippet(self, obj):
+        """Получаем фрагмент с найденными словами, если был поиск"""
+
+        return search.render_snippet(getattr(obj, 'search_snippet', None))
+
+
+class CookQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам"""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=settings.COOK_MAX_INGREDIENTS
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.COOK_RESULTS_MAX_LIMIT,
+        default=settings.COOK_RESULTS_LIMIT
+    )
+
+
+class CookRecipeSerializer(RecipesSerializer):
+    """Рецепт с долей имеющихся ингредиентов и числом недостающих"""
+
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipesSerializer.Meta):
+        fields = RecipesSerializer.Meta.fields + ('coverage', 'missing')
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api import versions
+
+
+@receiver([post_save, post_delete])
+def invalidate_table(sender, **kwargs):
+    """Меняем версию таблицы после фиксации транзакции"""
+
+    table = sender._meta.db_table
+    transaction.on_commit(lambda: versions.invalidate_table(table))
+
+
+@receiver(m2m_changed)
+def invalidate_m2m_table(sender, action, **kwargs):
+    """То же для промежуточной таблицы связи многие ко многим"""
+
+    if action.startswith('post_'):
+        invalidate_table(sender)
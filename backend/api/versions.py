@@ -0,0 +1,72 @@
+"""Версии таблиц.
+
+Версия таблицы - время последней записи в нее. Версии лежат в кеше
+TABLE_VERSIONS_CACHE_ALIAS и меняются сигналами api.signals после
+фиксации транзакции. По ним сбрасываются закешированные count пагинации
+и считаются ETag и Last-Modified ответов. Если версии нет в кеше, она
+заводится заново текущим временем, чтобы не совпасть со старой.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.sql import Query
+
+
+def get_cache():
+    return caches[settings.TABLE_VERSIONS_CACHE_ALIAS]
+
+
+def version_key(table):
+    return f'table:version:{table}'
+
+
+def invalidate_table(table):
+    """Меняем версию таблицы после записи в нее"""
+
+    get_cache().set(version_key(table), time.time(), timeout=None)
+
+
+def get_query_tables(query):
+    """Таблицы запроса вместе с таблицами его подзапросов
+
+    Фильтры через Exists, Subquery и __in=queryset не добавляют JOIN в
+    alias_map внешнего запроса, поэтому обходим условия и аннотации и
+    собираем таблицы вложенных Query.
+    """
+
+    tables = set()
+    nodes = [query]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, Query):
+            tables.update(
+                join.table_name for join in node.alias_map.values()
+            )
+            nodes.append(node.where)
+            nodes.extend(node.annotations.values())
+            continue
+        nested = getattr(node, 'query', None)
+        if isinstance(nested, Query):
+            nodes.append(nested)
+        nodes.extend(getattr(node, 'children', ()))
+        nodes.extend(
+            getattr(node, side) for side in ('lhs', 'rhs')
+            if hasattr(node, side)
+        )
+        if hasattr(node, 'get_source_expressions'):
+            nodes.extend(node.get_source_expressions())
+    return tables
+
+
+def get_versions(tables):
+    """Версии таблиц в порядке tables"""
+
+    cache = get_cache()
+    keys = [version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
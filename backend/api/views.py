@@ -1,22 +1,30 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from api.exporters import EXPORTERS
 from api.filters import IngredientsFilter, RecipesFilterSet
-from api.mixins import FavoriteCart
+from api.mixins import ConditionalMixin, FavoriteCart, ReferenceListMixin
+from api.pagination import (CachedCountPageNumberPagination,
+                            IdCursorPagination, PageNumberOrCursorPagination)
 from api.permissions import IsAdminAuthorOrReadOnly
-from api.serializers import (CustomUserSerializer, IngredientsSerializer,
+from api.serializers import (CookQuerySerializer, CookRecipeSerializer,
+                             CustomUserSerializer, IngredientsSerializer,
                              RecipesSerializer, ShortSerializer,
                              SubscribeSerializer, TagsSerializer)
-from api.utils import download_pdf
+from api.utils import download_shopping_list
+from recipes.cook import find_recipes
+from recipes.feed import filter_feed
+from recipes.minhash import find_alike
 from recipes.models import (Cart, Favorite, IngredientInRecipe, Ingredients,
-                            Recipes, Tags)
+                            PopularRecipe, Recipes, Tags)
 from users.models import Subscribe, User
 
 
@@ -26,7 +34,7 @@ class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAdminAuthorOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrCursorPagination
 
     @action(
         methods=['get'], detail=False,
@@ -41,18 +49,42 @@ class CustomUserViewSet(UserViewSet):
             status=status.HTTP_200_OK
         )
 
+    def get_subscriptions_queryset(self, request):
+        """Подписки пользователя со списком рецептов авторов
+
+        Рецепты всех авторов страницы подгружаются одним запросом,
+        recipes_limit ограничивает их число на автора подзапросом. Число
+        рецептов берется из счетчика автора.
+        """
+
+        recipes = Recipes.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit', '')
+        if recipes_limit.isdigit():
+            recipes = recipes.filter(id__in=Subquery(
+                Recipes.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:int(recipes_limit)]
+            ))
+        return Subscribe.objects.filter(user=request.user).select_related(
+            'author'
+        ).prefetch_related(
+            Prefetch(
+                'author__recipe_author', queryset=recipes,
+                to_attr='short_recipes'
+            )
+        )
+
     @action(
         methods=['get'], detail=False,
         permission_classes=[IsAuthenticated],
-        pagination_class=PageNumberPagination
+        pagination_class=PageNumberOrCursorPagination
     )
     def subscriptions(self, request):
         """Получить подписки пользователя"""
 
         serializer = SubscribeSerializer(
-            self.paginate_queryset(
-                Subscribe.objects.filter(user=request.user)
-            ), many=True, context={'request': request}
+            self.paginate_queryset(self.get_subscriptions_queryset(request)),
+            many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
@@ -77,8 +109,9 @@ class CustomUserViewSet(UserViewSet):
                     {'errors': f'Вы уже подписаны на {author.username}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            subscribe = Subscribe.objects.create(user=user, author=author)
             serializer = SubscribeSerializer(
-                Subscribe.objects.create(user=user, author=author),
+                self.get_subscriptions_queryset(request).get(id=subscribe.id),
                 context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -96,7 +129,7 @@ class CustomUserViewSet(UserViewSet):
         )
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(ReferenceListMixin, ReadOnlyModelViewSet):
     """Вьюсет для модели Ingredients"""
 
     serializer_class = IngredientsSerializer
@@ -104,10 +137,10 @@ class IngredientsViewSet(ReadOnlyModelViewSet):
     permission_classes = [IsAdminAuthorOrReadOnly]
     pagination_class = None
     filter_backends = [IngredientsFilter]
-    search_fields = ('^name',)
+    reference_filter_params = (IngredientsFilter.search_param,)
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(ReferenceListMixin, ReadOnlyModelViewSet):
     """Вьюсет для модели Tags"""
 
     serializer_class = TagsSerializer
@@ -116,16 +149,131 @@ class TagsViewSet(ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipesViewSet(ModelViewSet, FavoriteCart):
+class RecipesViewSet(ConditionalMixin, ModelViewSet, FavoriteCart):
     """Вьюсет для модели Recipes, Favorite и Cart"""
 
     queryset = Recipes.objects.all()
     serializer_class = RecipesSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrCursorPagination
     permission_classes = [IsAdminAuthorOrReadOnly]
     filter_class = RecipesFilterSet
     add_serializer = ShortSerializer
     add_model = Recipes
+    conditional_models = (
+        Recipes, User, Subscribe, Favorite, Cart, Tags, Ingredients,
+        IngredientInRecipe, Recipes.tags.through
+    )
+
+    def get_queryset(self):
+        """Рецепты со связями и флагами текущего пользователя"""
+
+        return Recipes.objects.add_user_annotations(self.request.user)
+
+    def get_renderers(self):
+        """Форматы списка покупок берем из реестра экспортеров"""
+
+        if self.action == 'download_shopping_cart':
+            return [exporter() for exporter in EXPORTERS.values()]
+        return super().get_renderers()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Ошибки выгрузки списка покупок отдаем в JSON"""
+
+        if (isinstance(response, Response)
+                and self.action == 'download_shopping_cart'):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @action(
+        methods=['get'], detail=False, permission_classes=[IsAuthenticated],
+        pagination_class=IdCursorPagination
+    )
+    def feed(self, request):
+        """Лента рецептов авторов из подписок, читается курсором"""
+
+        page = self.paginate_queryset(filter_feed(
+            self.filter_queryset(self.get_queryset()), request.user
+        ))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['get'], detail=False,
+        pagination_class=CachedCountPageNumberPagination
+    )
+    def popular(self, request):
+        """Популярные рецепты за период: day, week или all"""
+
+        period = request.query_params.get('period', PopularRecipe.WEEK)
+        if period not in dict(PopularRecipe.PERIODS):
+            return Response(
+                {'errors': 'Период должен быть одним из: day, week, all'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).filter(
+                popularity__period=period
+            ).order_by('-popularity__score', '-id')
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=True)
+    def similar(self, request, pk):
+        """Рецепты, которые добавляли вместе с этим рецептом"""
+
+        recipe = get_object_or_404(self.add_model, id=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score', '-id')[
+            :settings.SIMILAR_RECIPES_LIMIT
+        ]
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(methods=['get'], detail=True)
+    def alike(self, request, pk):
+        """Рецепты с похожим набором ингредиентов и тегов"""
+
+        recipe = get_object_or_404(
+            self.add_model.objects.only('id', 'minhash'), id=pk
+        )
+        matches = find_alike(
+            recipe, settings.RECIPE_ALIKE_THRESHOLD,
+            settings.RECIPE_ALIKE_LIMIT
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in matches]
+        )
+        serializer = self.get_serializer([
+            recipes[recipe_id] for recipe_id, _ in matches
+            if recipe_id in recipes
+        ], many=True)
+        return Response(serializer.data)
+
+    @action(methods=['get'], detail=False)
+    def cook(self, request):
+        """Рецепты по доле ингредиентов, которые уже есть у пользователя"""
+
+        params = CookQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = find_recipes(
+            params.validated_data['ingredients'],
+            params.validated_data['limit']
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for *_, recipe_id in matches]
+        )
+        results = []
+        for coverage, _, missing, recipe_id in matches:
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.coverage, recipe.missing = coverage, missing
+                results.append(recipe)
+        return Response(CookRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        ).data)
 
     @action(
         methods=['post', 'delete'],
@@ -159,15 +307,16 @@ class RecipesViewSet(ModelViewSet, FavoriteCart):
         methods=['get'], detail=False, permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        """Скачать список покупок в pdf"""
+        """Скачать список покупок в pdf, txt, csv или json"""
 
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__cart__user=request.user).values_list(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(Sum('amount')).order_by()
+        ingredients = request.user.shopping_list.values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name')
 
-        if ingredients:
-            return download_pdf(request, ingredients)
+        if ingredients.exists():
+            return download_shopping_list(
+                request.accepted_renderer, ingredients.iterator()
+            )
         return Response(
             {'errors': 'Нет рецептов в списке покупок'},
             status=status.HTTP_400_BAD_REQUEST
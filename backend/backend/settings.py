@@ -81,6 +81,16 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -175,3 +185,78 @@ TAG_SLUG_NAME: int = 200
 TAG_COLOR: int = 7
 INGREDIENTS: int = 200
 RECIPE_NAME: int = 200
+
+RECIPES_SEARCH_MAX_RESULTS: int = 1000
+
+COOK_INDEX_TIMEOUT: int = 300
+COOK_RESULTS_LIMIT: int = 20
+COOK_RESULTS_MAX_LIMIT: int = 100
+COOK_MAX_INGREDIENTS: int = 100
+
+FEED_MAX_LENGTH: int = 500
+FEED_TRIM_SLACK: int = 50
+FEED_FANOUT_MAX_FOLLOWERS: int = 1000
+FEED_FANOUT_BATCH_SIZE: int = 1000
+
+POPULAR_RECIPES_LIMIT: int = 100
+POPULAR_RECIPES_FAVORITE_WEIGHT: int = 2
+POPULAR_RECIPES_CART_WEIGHT: int = 1
+
+SIMILAR_RECIPES_LIMIT: int = 20
+SIMILAR_RECIPES_FAVORITE_WEIGHT: float = 1.0
+SIMILAR_RECIPES_CART_WEIGHT: float = 0.5
+SIMILAR_RECIPES_MIN_COMMON_USERS: int = 2
+SIMILAR_RECIPES_MAX_USER_ITEMS: int = 500
+SIMILAR_RECIPES_MAX_PAIRS: int = 5000000
+SIMILAR_RECIPES_RECENT_HOURS: int = 2
+SIMILAR_RECIPES_BATCH_SIZE: int = 5000
+
+RECIPE_MINHASH_BANDS: int = 16
+RECIPE_MINHASH_ROWS: int = 4
+RECIPE_ALIKE_THRESHOLD: float = 0.5
+RECIPE_ALIKE_LIMIT: int = 20
+RECIPE_ALIKE_MAX_CANDIDATES: int = 1000
+RECIPE_DUPLICATE_THRESHOLD: float = 0.9
+RECIPE_DUPLICATE_MAX_BUCKET: int = 1000
+
+TABLE_VERSIONS_CACHE_ALIAS: str = 'default'
+CONDITIONAL_RESPONSES: bool = os.getenv(
+    'CONDITIONAL_RESPONSES', default='0'
+) != '0'
+
+PAGINATION_COUNT_CACHE_ALIAS: str = 'default'
+PAGINATION_COUNT_TIMEOUT: int = 30
+PAGINATION_COUNT_ESTIMATE_THRESHOLD: int = 100_000
+
+REFERENCE_CACHE_ALIAS: str = 'default'
+REFERENCE_CACHE_TIMEOUT: int = 300
+
+INGREDIENTS_AUTOCOMPLETE_BACKEND: str = os.getenv(
+    'INGREDIENTS_AUTOCOMPLETE_BACKEND', default=''
+)
+INGREDIENTS_AUTOCOMPLETE_LIMIT: int = 20
+INGREDIENTS_AUTOCOMPLETE_MAX_LIMIT: int = 100
+
+PDF_FONT_NAME: str = 'Roboto-Regular'
+PDF_FONT_PATH: str = os.path.join(
+    BASE_DIR, 'recipes', 'static', 'fonts', 'Roboto-Regular.ttf'
+)
+PDF_WARM_UP: bool = os.getenv('PDF_WARM_UP', default='1') != '0'
+PDF_CHUNK_SIZE: int = 64 * 1024
+
+BACKGROUND_WORKERS: int = int(os.getenv('BACKGROUND_WORKERS', default=2))
+BACKGROUND_TASKS_SYNC: bool = os.getenv(
+    'BACKGROUND_TASKS_SYNC', default='0'
+) == '1'
+
+RECIPE_IMAGE_VARIANTS: dict = {'thumbnail': 160, 'card': 480, 'full': 1280}
+RECIPE_IMAGE_FORMATS: tuple = tuple(os.getenv(
+    'RECIPE_IMAGE_FORMATS', default='webp,jpeg'
+).split(','))
+RECIPE_IMAGE_QUALITY: int = 80
+
+IMAGE_UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_SIDE: int = 8000
+IMAGE_UPLOAD_MAX_PIXELS: int = 40_000_000
+IMAGE_UPLOAD_SPOOL_SIZE: int = 1024 * 1024
+IMAGE_UPLOAD_CHUNK_SIZE: int = 64 * 1024
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Prefetch
 
 from recipes.models import Cart, Favorite, Ingredients, Recipes, Tags
 
@@ -27,6 +28,9 @@ class IngredientInRecipeInline(admin.TabularInline):
     )
     readonly_fields = ('get_measurement_unit',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
+
     @admin.display(description='Ед. измерения')
     def get_measurement_unit(self, obj):
         return obj.ingredient.measurement_unit
@@ -35,26 +39,26 @@ class IngredientInRecipeInline(admin.TabularInline):
 @admin.register(Recipes)
 class RecipesAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'name', 'author', 'get_ingredients', 'get_favorites_count',
-        'get_shopping_cart_count'
+        'id', 'name', 'author', 'get_ingredients', 'favorites_count',
+        'shopping_cart_count'
     )
     search_fields = ('id', 'name', 'tags', 'ingredients')
     list_filter = ('name', 'tags', 'author')
     autocomplete_fields = ('author', 'tags')
     inlines = [IngredientInRecipeInline]
+    list_select_related = ('author',)
 
-    @admin.display(description='Ингредиенты')
-    def get_ingredients(self, obj):
-        return list(Recipes.objects.filter(id=obj.id).values_list(
-            'ingredients__name', flat=True).order_by('-ingredients__name'))
+    def get_queryset(self, request):
+        """Ингредиенты всех рецептов страницы подгружаем одним запросом"""
 
-    @admin.display(description='Добавили в избранное')
-    def get_favorites_count(self, obj):
-        return obj.favorite.count()
+        return super().get_queryset(request).prefetch_related(Prefetch(
+            'ingredients',
+            queryset=Ingredients.objects.only('name').order_by('-name')
+        ))
 
-    @admin.display(description='Добавили в список покупок')
-    def get_shopping_cart_count(self, obj):
-        return obj.cart.count()
+    @admin.display(description='Ингредиенты')
+    def get_ingredients(self, obj):
+        return [ingredient.name for ingredient in obj.ingredients.all()]
 
 
 @admin.register(Favorite)
@@ -63,6 +67,7 @@ class FavoriteAdmin(admin.ModelAdmin):
     search_fields = ('user', 'recipe')
     list_filter = ('recipe',)
     autocomplete_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
 
 
 @admin.register(Cart)
@@ -71,3 +76,4 @@ class CartAdmin(admin.ModelAdmin):
     search_fields = ('user', 'recipe')
     list_filter = ('recipe',)
     autocomplete_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
@@ -0,0 +1,107 @@
+"""Автодополнение ингредиентов по названию.
+
+Сначала идут ингредиенты, название которых начинается с запроса, затем
+те, где запрос встречается внутри названия, в каждой группе по алфавиту.
+На PostgreSQL поиск идет по индексам UPPER(name) text_pattern_ops и
+pg_trgm (миграция 0004), на остальных базах - по индексу в памяти,
+построенному по снимку справочника ингредиентов (recipes.reference).
+"""
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connection
+
+from recipes import reference
+from recipes.models import Ingredients
+
+
+class PrefixIndex:
+    """Отсортированный индекс названий для поиска по префиксу и вхождению"""
+
+    separator = '\n'
+
+    def __init__(self, ingredients):
+        self.items = sorted(
+            ingredients, key=lambda item: (item[1].lower(), item[0])
+        )
+        self.names = [name.lower() for _, name, _ in self.items]
+        self.offsets = []
+        offset = 0
+        for name in self.names:
+            self.offsets.append(offset)
+            offset += len(name) + len(self.separator)
+        self.text = self.separator.join(self.names)
+
+    def prefix(self, query, limit):
+        """Позиции названий, начинающихся с query"""
+
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + '\U0010ffff', lo=start)
+        return range(start, min(end, start + limit))
+
+    def substring(self, query, limit, exclude):
+        """Позиции названий, содержащих query не с начала"""
+
+        found = []
+        position = self.text.find(query)
+        while position != -1 and len(found) < limit:
+            index = bisect_right(self.offsets, position) - 1
+            if index not in exclude and position > self.offsets[index]:
+                found.append(index)
+            next_name = index + 1
+            if next_name == len(self.offsets):
+                break
+            position = self.text.find(query, self.offsets[next_name])
+        return found
+
+    def search(self, query, limit):
+        """Ингредиенты: сначала совпадения префикса, затем вхождения"""
+
+        query = query.lower()
+        found = list(self.prefix(query, limit))
+        if len(found) < limit:
+            found += self.substring(query, limit - len(found), set(found))
+        return [
+            Ingredients(id=pk, name=name, measurement_unit=measurement_unit)
+            for pk, name, measurement_unit in (
+                self.items[index] for index in found
+            )
+        ]
+
+
+def get_index():
+    """Индекс ингредиентов из кеша справочников, строится раз на версию"""
+
+    return reference.get(Ingredients).derive(
+        'prefix_index', lambda data: PrefixIndex(data.rows)
+    )
+
+
+def database_search(query, limit):
+    """Поиск в базе двумя запросами по индексам префикса и триграмм"""
+
+    found = list(
+        Ingredients.objects.filter(name__istartswith=query).order_by(
+            'name', 'id'
+        )[:limit]
+    )
+    if len(found) < limit:
+        found += Ingredients.objects.filter(name__icontains=query).exclude(
+            name__istartswith=query
+        ).order_by('name', 'id')[:limit - len(found)]
+    return found
+
+
+def use_database():
+    backend = settings.INGREDIENTS_AUTOCOMPLETE_BACKEND
+    if backend:
+        return backend == 'database'
+    return connection.vendor == 'postgresql'
+
+
+def search(query, limit):
+    """Подсказки ингредиентов по началу или части названия"""
+
+    if use_database():
+        return database_search(query, limit)
+    return get_index().search(query, limit)
@@ -0,0 +1,149 @@
+"""Подбор рецептов по ингредиентам, которые есть у пользователя.
+
+Обратный индекс ингредиент -> отсортированный массив id рецептов
+(array('I')) хранится в памяти процесса вместе с набором ингредиентов
+каждого рецепта. Покрытие рецепта - доля его ингредиентов, которые есть в
+запросе. Совпадения считаются Counter по массивам ингредиентов из запроса,
+без GROUP BY по IngredientInRecipe, лучшие рецепты выбираются heapq.
+
+Версия индекса лежит в кеше справочников (recipes.reference). После
+сохранения рецепта процесс, в котором оно произошло, меняет в своем
+индексе только строки этого рецепта и записывает новую версию. Остальные
+процессы видят чужую версию и перестраивают индекс целиком, без общего
+кеша индекс устаревает через COOK_INDEX_TIMEOUT.
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from uuid import uuid4
+
+from django.conf import settings
+
+from recipes import reference
+from recipes.models import IngredientInRecipe
+
+VERSION_KEY = 'cook:index:version'
+
+
+class IngredientIndex:
+    """Обратный индекс: ингредиент -> отсортированные id рецептов"""
+
+    typecode = 'I'
+
+    def __init__(self, version):
+        self.version = version
+        self.loaded = time.monotonic()
+        recipes = {}
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.order_by(
+            'recipe_id'
+        ).values_list('recipe_id', 'ingredient_id').iterator():
+            recipes.setdefault(recipe_id, set()).add(ingredient_id)
+        postings = {}
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings.setdefault(ingredient_id, []).append(recipe_id)
+        self.recipes = {
+            recipe_id: frozenset(ingredient_ids)
+            for recipe_id, ingredient_ids in recipes.items()
+        }
+        self.postings = {
+            ingredient_id: array(self.typecode, recipe_ids)
+            for ingredient_id, recipe_ids in postings.items()
+        }
+
+    def expired(self):
+        return time.monotonic() - self.loaded > settings.COOK_INDEX_TIMEOUT
+
+    def update(self, recipe_id, ingredient_ids):
+        """Заменяем ингредиенты рецепта, пустой набор - удаление рецепта
+
+        Массивы не меняются на месте, а заменяются копиями, чтобы
+        параллельный подбор видел либо старый, либо новый массив.
+        """
+
+        old = self.recipes.pop(recipe_id, frozenset())
+        new = frozenset(ingredient_ids)
+        for ingredient_id in old - new:
+            recipe_ids = array(self.typecode, self.postings[ingredient_id])
+            recipe_ids.remove(recipe_id)
+            if recipe_ids:
+                self.postings[ingredient_id] = recipe_ids
+            else:
+                del self.postings[ingredient_id]
+        for ingredient_id in new - old:
+            recipe_ids = array(
+                self.typecode, self.postings.get(ingredient_id, ())
+            )
+            recipe_ids.insert(bisect_left(recipe_ids, recipe_id), recipe_id)
+            self.postings[ingredient_id] = recipe_ids
+        if new:
+            self.recipes[recipe_id] = new
+
+    def match(self, ingredient_ids, limit):
+        """Лучшие рецепты: (покрытие, совпало ингредиентов, нет, id)"""
+
+        counts = Counter(chain.from_iterable(
+            self.postings.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        matches = []
+        for recipe_id, matched in counts.items():
+            total = len(self.recipes.get(recipe_id, ()))
+            if total:
+                matches.append(
+                    (matched / total, matched, total - matched, recipe_id)
+                )
+        return heapq.nlargest(limit, matches)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_version():
+    return reference.get_cache().get_or_set(
+        VERSION_KEY, uuid4().hex, timeout=None
+    )
+
+
+def get_index():
+    """Актуальный индекс процесса"""
+
+    global _index
+    version = get_version()
+    index = _index
+    if index is None or index.version != version or index.expired():
+        index = IngredientIndex(version)
+        _index = index
+    return index
+
+
+def find_recipes(ingredient_ids, limit):
+    return get_index().match(ingredient_ids, limit)
+
+
+def update_recipe(recipe_id):
+    """Обновляем строки рецепта в индексе процесса и версию индекса"""
+
+    ingredient_ids = list(IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True))
+    with _lock:
+        version = uuid4().hex
+        index = _index
+        if index is not None and index.version == get_version():
+            index.update(recipe_id, ingredient_ids)
+            index.version = version
+        reference.get_cache().set(VERSION_KEY, version, timeout=None)
+
+
+def invalidate():
+    """Перестраиваем индекс целиком, например после удаления ингредиента"""
+
+    global _index
+    _index = None
+    reference.get_cache().set(VERSION_KEY, uuid4().hex, timeout=None)
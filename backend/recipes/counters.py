@@ -0,0 +1,59 @@
+"""Счетчики избранного, списков покупок, рецептов и подписчиков.
+
+Счетчик хранится в поле целевой модели и меняется на единицу выражением
+F() при создании и удалении строки источника (сигналы recipes.signals),
+в той же транзакции. Массовые операции без сигналов и смену автора
+рецепта исправляет команда reconcile_counters.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Cart, Favorite, Recipes
+from users.models import Subscribe, User
+
+# (модель-источник, поле внешнего ключа, целевая модель, поле счетчика)
+COUNTERS = (
+    (Favorite, 'recipe', Recipes, 'favorites_count'),
+    (Cart, 'recipe', Recipes, 'shopping_cart_count'),
+    (Recipes, 'author', User, 'recipes_count'),
+    (Subscribe, 'author', User, 'followers_count'),
+)
+
+
+def get_counters(source):
+    return [counter for counter in COUNTERS if counter[0] is source]
+
+
+def change(instance, delta):
+    """Меняем счетчики, на которые влияет строка instance"""
+
+    for _, foreign_key, target, field in get_counters(type(instance)):
+        target.objects.filter(
+            pk=getattr(instance, f'{foreign_key}_id')
+        ).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_subquery(source, foreign_key):
+    """Подзапрос числа строк источника для OuterRef('pk')"""
+
+    return Coalesce(Subquery(
+        source.objects.filter(**{foreign_key: OuterRef('pk')}).order_by(
+        ).values(foreign_key).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def reconcile(fix=True):
+    """Сверяем счетчики с данными, возвращаем {поле: число расхождений}"""
+
+    mismatches = {}
+    for source, foreign_key, target, field in COUNTERS:
+        wrong = list(target.objects.annotate(
+            actual=count_subquery(source, foreign_key)
+        ).exclude(**{field: F('actual')}).only('pk', field))
+        if fix and wrong:
+            for obj in wrong:
+                setattr(obj, field, obj.actual)
+            target.objects.bulk_update(wrong, [field], batch_size=1000)
+        mismatches[f'{target.__name__}.{field}'] = len(wrong)
+    return mismatches
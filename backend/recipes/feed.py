@@ -0,0 +1,100 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт после фиксации транзакции раскладывается в ленты подписчиков
+автора (fan-out on write, фоновая задача recipes.tasks). Лента хранит не
+больше FEED_MAX_LENGTH последних рецептов, лишние записи удаляются, когда
+их набирается больше FEED_TRIM_SLACK. Рецепты авторов, у которых больше
+FEED_FANOUT_MAX_FOLLOWERS подписчиков, в ленты не раскладываются, а
+подмешиваются при чтении (fan-out on read). При подписке в ленту
+добавляются последние рецепты автора, при отписке - удаляются.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from recipes.models import FeedEntry, Recipes
+from users.models import Subscribe, User
+
+
+def is_popular(followers_count):
+    return followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def trim(user_ids):
+    """Обрезаем переполненные ленты пользователей до FEED_MAX_LENGTH"""
+
+    limit = settings.FEED_MAX_LENGTH
+    overflow = FeedEntry.objects.filter(user_id__in=user_ids).values(
+        'user_id'
+    ).annotate(total=Count('id')).filter(
+        total__gt=limit + settings.FEED_TRIM_SLACK
+    ).order_by().values_list('user_id', flat=True)
+    for user_id in overflow:
+        entries = FeedEntry.objects.filter(user_id=user_id)
+        cutoff = entries.order_by('-recipe_id').values_list(
+            'recipe_id', flat=True
+        )[limit - 1]
+        entries.filter(recipe_id__lt=cutoff).delete()
+
+
+def fan_out(recipe_id):
+    """Фоновая задача: добавляем рецепт в ленты подписчиков автора"""
+
+    author = Recipes.objects.filter(id=recipe_id).values_list(
+        'author_id', 'author__followers_count'
+    ).first()
+    if author is None or is_popular(author[1]):
+        return
+    followers = Subscribe.objects.filter(author_id=author[0]).values_list(
+        'user_id', flat=True
+    ).iterator()
+    batch = list(islice(followers, settings.FEED_FANOUT_BATCH_SIZE))
+    while batch:
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, recipe_id=recipe_id)
+             for user_id in batch),
+            ignore_conflicts=True
+        )
+        trim(batch)
+        batch = list(islice(followers, settings.FEED_FANOUT_BATCH_SIZE))
+
+
+def add_author(user_id, author_id):
+    """Добавляем в ленту последние рецепты автора после подписки"""
+
+    if is_popular(User.objects.get(id=author_id).followers_count):
+        return
+    recipe_ids = Recipes.objects.filter(author_id=author_id).order_by(
+        '-id'
+    ).values_list('id', flat=True)[:settings.FEED_MAX_LENGTH]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe_id)
+         for recipe_id in recipe_ids),
+        ignore_conflicts=True
+    )
+    trim([user_id])
+
+
+def remove_author(user_id, author_id):
+    """Убираем из ленты рецепты автора после отписки"""
+
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def filter_feed(queryset, user):
+    """Рецепты из ленты пользователя и рецепты популярных авторов
+
+    Фильтр собирается в один запрос с подзапросами, порядок по -id
+    позволяет читать ленту курсорной пагинацией.
+    """
+
+    return queryset.filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author_id__in=Subscribe.objects.filter(
+            user=user,
+            author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values('author_id'))
+    ).order_by('-id')
@@ -0,0 +1,112 @@
+"""Уменьшенные копии картинок рецептов.
+
+Оригинал сохраняется в запросе как есть, а копии размеров
+RECIPE_IMAGE_VARIANTS в форматах RECIPE_IMAGE_FORMATS считаются в фоне
+(recipes.tasks) и записываются в Recipes.images в виде
+{'thumbnail': {'webp': путь, 'jpeg': путь}, ...}. Форматы, которые не
+поддерживает установленный Pillow (например avif), пропускаются.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from recipes.models import Recipes
+
+VARIANTS_DIR = 'recipes/variants'
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+    'avif': ('AVIF', 'avif'),
+}
+
+
+def get_formats():
+    """Форматы из настроек, которые умеет сохранять Pillow"""
+
+    return [
+        image_format for image_format in settings.RECIPE_IMAGE_FORMATS
+        if image_format in FORMATS
+        and features.check(FORMATS[image_format][1])
+    ]
+
+
+def variants_dir(recipe_id):
+    return f'{VARIANTS_DIR}/{recipe_id}'
+
+
+def save_variant(image, path, image_format):
+    """Сохраняем копию в хранилище, перезаписывая старый файл"""
+
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(
+        buffer, FORMATS[image_format][0],
+        quality=settings.RECIPE_IMAGE_QUALITY
+    )
+    default_storage.delete(path)
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def build_variants(recipe):
+    """Считаем и сохраняем копии картинки рецепта"""
+
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    formats = get_formats()
+    images = {}
+    with recipe.image.open('rb') as file, Image.open(file) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert(
+                'RGBA' if 'transparency' in original.info else 'RGB'
+            )
+        for name, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            image = original.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            images[name] = {
+                image_format: save_variant(
+                    image, f'{variants_dir(recipe.id)}/{stem}_{name}.'
+                    f'{image_format}', image_format
+                ) for image_format in formats
+            }
+    return images
+
+
+def delete_variants(recipe_id, keep=()):
+    """Удаляем файлы копий рецепта, кроме keep"""
+
+    directory = variants_dir(recipe_id)
+    if not default_storage.exists(directory):
+        return
+    for file_name in default_storage.listdir(directory)[1]:
+        path = f'{directory}/{file_name}'
+        if path not in keep:
+            default_storage.delete(path)
+
+
+def make_variants(recipe_id):
+    """Фоновая задача: копии картинки рецепта
+
+    Результат записывается, только если картинка не поменялась, пока
+    считались копии, иначе ее копии посчитает следующая задача.
+    """
+
+    recipe = Recipes.objects.filter(id=recipe_id).only('id', 'image').first()
+    if recipe is None or not recipe.image:
+        return
+    images = build_variants(recipe)
+    paths = {
+        path for formats in images.values() for path in formats.values()
+    }
+    if Recipes.objects.filter(
+        id=recipe_id, image=recipe.image.name
+    ).update(images=images, updated_at=timezone.now()):
+        delete_variants(recipe_id, keep=paths)
+    else:
+        for path in paths:
+            default_storage.delete(path)
@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.core.management import BaseCommand
+
+from recipes import autocomplete
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+def make_ingredients(count, seed):
+    """Синтетические ингредиенты (id, название, ед. измерения)"""
+
+    generator = random.Random(seed)
+    return [
+        (number, ' '.join(
+            ''.join(generator.choices(ALPHABET, k=generator.randint(3, 9)))
+            for _ in range(generator.randint(1, 3))
+        ), 'г') for number in range(1, count + 1)
+    ]
+
+
+def make_queries(names, count, seed):
+    """Запросы: начала названий и их части длиной от 1 до 5 символов"""
+
+    generator = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = generator.choice(names)
+        length = generator.randint(1, min(5, len(name)))
+        start = generator.choice((0, generator.randint(0, len(name) - length)))
+        queries.append(name[start:start + length])
+    return queries
+
+
+class Command(BaseCommand):
+    help = ("Задержки автодополнения ингредиентов (p50/p99)."
+            "Запуск: python manage.py bench_autocomplete [--database].")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--database', action='store_true',
+            help='Искать по ингредиентам текущей базы через recipes.'
+                 'autocomplete.search вместо синтетического индекса'
+        )
+
+    def handle(self, *args, **options):
+        if options['database']:
+            search = autocomplete.search
+            names = [
+                name for _, name, _ in autocomplete.get_index().items
+            ]
+            source = 'база'
+        else:
+            start = time.perf_counter()
+            index = autocomplete.PrefixIndex(
+                make_ingredients(options['size'], seed=1)
+            )
+            self.stdout.write(
+                f'Индекс на {options["size"]} ингредиентов построен за '
+                f'{(time.perf_counter() - start) * 1000:.0f} мс'
+            )
+            search = index.search
+            names = index.names
+            source = 'память'
+        timings = []
+        for query in make_queries(names, options['queries'], seed=2):
+            start = time.perf_counter()
+            search(query, options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{source}: {len(timings)} запросов, '
+            f'p50 {timings[len(timings) // 2]:.3f} мс, '
+            f'p99 {timings[int(len(timings) * 0.99)]:.3f} мс, '
+            f'max {timings[-1]:.3f} мс'
+        )
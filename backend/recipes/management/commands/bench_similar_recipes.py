@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.similar import CoOccurrence
+
+
+def make_favorites(size, users, recipes, clusters, noise, seed):
+    """Синтетическое избранное: у каждого пользователя любимая группа
+
+    Рецепт i относится к группе i % clusters. Доля noise добавлений - из
+    случайных рецептов, остальные - из группы пользователя.
+    """
+
+    generator = np.random.default_rng(seed)
+    user_ids = generator.integers(0, users, size)
+    cluster = generator.integers(0, clusters, users)[user_ids]
+    per_cluster = recipes // clusters
+    recipe_ids = (
+        generator.integers(0, per_cluster, size) * clusters + cluster
+    )
+    random = generator.random(size) < noise
+    recipe_ids[random] = generator.integers(0, recipes, random.sum())
+    return user_ids, recipe_ids, generator.random(size)
+
+
+class Command(BaseCommand):
+    help = ("Время расчета и точность похожих рецептов на синтетическом "
+            "избранном. Запуск: python manage.py bench_similar_recipes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--favorites', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--clusters', type=int, default=200)
+        parser.add_argument('--noise', type=float, default=0.2)
+        parser.add_argument(
+            '--recent', type=float, default=0.01,
+            help='Доля пользователей с недавними добавлениями'
+        )
+
+    def handle(self, *args, **options):
+        users, recipes, times = make_favorites(
+            options['favorites'], options['users'], options['recipes'],
+            options['clusters'], options['noise'], seed=1
+        )
+        start = time.perf_counter()
+        data = CoOccurrence(
+            users, recipes, np.ones(len(users)), times,
+            settings.SIMILAR_RECIPES_MAX_USER_ITEMS
+        )
+        self.stdout.write(
+            f'{len(data.items)} добавлений, {len(data.recipe_ids)} рецептов: '
+            f'подготовка {time.perf_counter() - start:.2f} с'
+        )
+        targets = np.ones(len(data.recipe_ids), dtype=bool)
+        self.measure('полный пересчет', data, targets, options['clusters'])
+        recent = np.unique(users[:int(options['users'] * options['recent'])])
+        self.measure(
+            'недавние', data, data.targets_of_users(recent),
+            options['clusters']
+        )
+
+    def measure(self, name, data, targets, clusters):
+        start = time.perf_counter()
+        found = same = chunks = 0
+        for items in data.chunks(targets, settings.SIMILAR_RECIPES_MAX_PAIRS):
+            sources, neighbours, _ = data.neighbours(
+                items, settings.SIMILAR_RECIPES_LIMIT,
+                settings.SIMILAR_RECIPES_MIN_COMMON_USERS
+            )
+            found += len(sources)
+            same += (sources % clusters == neighbours % clusters).sum()
+            chunks += 1
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{name}: {targets.sum()} рецептов, {chunks} пачек, '
+            f'{elapsed:.2f} с, соседей {found}, '
+            f'precision@{settings.SIMILAR_RECIPES_LIMIT} '
+            f'{same / max(found, 1):.3f} (случайно {1 / clusters:.3f})'
+        )
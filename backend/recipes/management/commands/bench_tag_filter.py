@@ -0,0 +1,128 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django_filters import rest_framework as filters
+from django_filters.rest_framework import FilterSet
+
+from api.filters import RecipesFilterSet
+from recipes import reference
+from recipes.models import Recipes, Tags
+
+POPULAR_TAGS = 20
+
+
+class LegacyRecipesFilterSet(FilterSet):
+    """Прежний фильтр: выбор из всех slug и JOIN с DISTINCT по тегам"""
+
+    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+
+    class Meta:
+        model = Recipes
+        fields = ('tags',)
+
+
+def create_tags(start, end):
+    """Теги с номерами start..end, возвращаем (id, slug)"""
+
+    slugs = [f'bench-{number}' for number in range(start, end)]
+    Tags.objects.bulk_create(
+        Tags(name=slug, color=f'#{number:06X}', slug=slug)
+        for number, slug in enumerate(slugs, start)
+    )
+    reference.invalidate(Tags)
+    return list(Tags.objects.filter(slug__in=slugs).values_list('id', 'slug'))
+
+
+def run_filter(filterset_class, request):
+    """Первая страница и число рецептов, как при запросе списка"""
+
+    queryset = filterset_class(
+        request.GET, Recipes.objects.all(), request=request
+    ).qs
+    list(queryset.values_list('id', flat=True)[:6])
+    return queryset.count()
+
+
+class Command(BaseCommand):
+    help = ("Задержки фильтра рецептов по тегам при росте таблицы тегов "
+            "(p50/p99). Данные создаются в транзакции и откатываются."
+            "Запуск: python manage.py bench_tag_filter.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000]
+        )
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+        reference.invalidate(Tags)
+
+    def run(self, options):
+        generator = random.Random(1)
+        author = get_user_model().objects.create(
+            username='bench-tag-filter', email='bench-tag-filter@bench.fake'
+        )
+        Recipes.objects.bulk_create(
+            Recipes(author=author, name=f'bench-{number}', text='bench',
+                    image='recipes/bench.png', cooking_time=1)
+            for number in range(options['recipes'])
+        )
+        recipe_ids = list(Recipes.objects.filter(
+            author=author
+        ).values_list('id', flat=True))
+        popular = create_tags(0, POPULAR_TAGS)
+        Recipes.tags.through.objects.bulk_create(
+            Recipes.tags.through(recipes_id=recipe_id, tags_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id, _ in generator.sample(popular, 3)
+        )
+        size = POPULAR_TAGS
+        factory = RequestFactory()
+        for target in sorted(options['sizes']):
+            if target > size:
+                Recipes.tags.through.objects.bulk_create(
+                    Recipes.tags.through(
+                        recipes_id=generator.choice(recipe_ids),
+                        tags_id=tag_id
+                    ) for tag_id, _ in create_tags(size, target)
+                )
+                size = target
+            requests = [
+                '&'.join(f'tags={slug}' for _, slug in generator.sample(
+                    popular, 2
+                )) for _ in range(options['queries'])
+            ]
+            for name, filterset_class, mode in (
+                ('прежний, любой', LegacyRecipesFilterSet, ''),
+                ('новый, любой', RecipesFilterSet, ''),
+                ('новый, все', RecipesFilterSet, '&tags_mode=all'),
+            ):
+                self.measure(size, name, filterset_class, [
+                    factory.get(f'/api/recipes/?{query}{mode}')
+                    for query in requests
+                ])
+
+    def measure(self, size, name, filterset_class, requests):
+        timings = []
+        for request in requests:
+            request.user = AnonymousUser()
+            start = time.perf_counter()
+            run_filter(filterset_class, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        first = timings[0]
+        timings.sort()
+        self.stdout.write(
+            f'{size} тегов, {name}: {len(timings)} запросов, '
+            f'первый {first:.3f} мс, '
+            f'p50 {timings[len(timings) // 2]:.3f} мс, '
+            f'p99 {timings[int(len(timings) * 0.99)]:.3f} мс'
+        )
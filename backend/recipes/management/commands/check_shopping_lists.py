@@ -0,0 +1,43 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = ("Проверка согласованности списков покупок с корзинами."
+            "Запуск: python manage.py check_shopping_lists [--fix].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Проверить списки только указанных пользователей'
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать списки пользователей с расхождениями'
+        )
+
+    def handle(self, *args, **options):
+        inconsistencies = shopping_list.find_inconsistencies(
+            options['user_ids']
+        )
+        if not inconsistencies:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+            return
+        for user_id, ingredient_id, expected, actual in inconsistencies:
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидается {expected}, сохранено {actual}'
+            )
+        user_ids = sorted({user_id for user_id, *_ in inconsistencies})
+        if options['fix']:
+            shopping_list.rebuild(user_ids)
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок пересобраны для {len(user_ids)} '
+                f'пользователей'
+            ))
+            return
+        raise CommandError(
+            f'Найдено расхождений: {len(inconsistencies)} '
+            f'у {len(user_ids)} пользователей'
+        )
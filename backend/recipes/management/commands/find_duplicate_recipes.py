@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes import minhash
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = ("Поиск почти одинаковых рецептов по составу для модерации."
+            "Запуск: python manage.py find_duplicate_recipes "
+            "[--threshold 0.9] [--rebuild].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=float,
+            default=settings.RECIPE_DUPLICATE_THRESHOLD,
+            help='Минимальное сходство составов от 0 до 1'
+        )
+        parser.add_argument(
+            '--max-bucket', type=int,
+            default=settings.RECIPE_DUPLICATE_MAX_BUCKET,
+            help='Пропускать корзины LSH, где больше рецептов'
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Сначала пересчитать подписи всех рецептов, например '
+                 'после правок в админке'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            for recipe_id in Recipes.objects.values_list(
+                'id', flat=True
+            ).iterator():
+                minhash.update_recipe(recipe_id)
+        duplicates, skipped = minhash.find_duplicates(
+            options['threshold'], options['max_bucket']
+        )
+        recipes = Recipes.objects.select_related('author').in_bulk({
+            recipe_id for _, *pair in duplicates for recipe_id in pair
+        })
+        for score, first, second in duplicates:
+            self.stdout.write(
+                f'{score:.2f}: {self.describe(recipes[first])} ~ '
+                f'{self.describe(recipes[second])}'
+            )
+        if skipped:
+            self.stdout.write(
+                f'Пропущено больших корзин: {skipped} (--max-bucket)'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Найдено похожих пар: {len(duplicates)}')
+        )
+
+    def describe(self, recipe):
+        return f'{recipe.id} «{recipe.name}» ({recipe.author.username})'
@@ -1,51 +1,223 @@
 import csv
-import datetime
+import io
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes import reference
 from recipes.models import Ingredients, Tags
 
-csv_files = (
-    (Tags, 'tags.csv'),
-    (Ingredients, 'ingredients.csv')
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'
 )
 
-fields = (
-    ('name', 'color', 'slug'),
-    ('name', 'measurement_unit')
-)
+JSON_CHUNK_SIZE = 64 * 1024
+VALUE_ENDS = tuple(' \t\n\r,]')
+
+models = {
+    'tags': (Tags, ('name', 'color', 'slug'), 'tags.csv'),
+    'ingredients': (
+        Ingredients, ('name', 'measurement_unit'), 'ingredients.csv'
+    ),
+}
+
+
+def skip_spaces(buffer, chunks):
+    """Буфер без пробелов в начале, пустой - только в конце файла"""
+
+    buffer = buffer.lstrip()
+    while not buffer:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return ''
+        buffer = chunk.lstrip()
+    return buffer
+
+
+def decode_value(decoder, buffer, chunks):
+    """Значение json в начале буфера и остаток буфера
+
+    Значение в массиве заканчивается пробелом, запятой или скобкой. Если
+    за ним еще ничего нет, оно могло оборваться на границе куска (число
+    1.5 из 1.5e3), поэтому дочитываем следующий кусок.
+    """
+
+    while True:
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            end = None
+        if end is not None and buffer[end:end + 1] in VALUE_ENDS:
+            return value, buffer[end:]
+        chunk = next(chunks, None)
+        if chunk is None:
+            if end is None:
+                decoder.raw_decode(buffer)
+            return value, buffer[end:]
+        buffer += chunk
+
+
+def read_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Элементы json массива по одному, файл читается по chunk_size"""
+
+    decoder = json.JSONDecoder()
+    chunks = iter(lambda: file.read(chunk_size), '')
+    buffer = skip_spaces('', chunks)
+    if not buffer.startswith('['):
+        raise ValueError('ожидался массив json')
+    buffer = skip_spaces(buffer[1:], chunks)
+    if buffer.startswith(']'):
+        return
+    while True:
+        value, buffer = decode_value(decoder, buffer, chunks)
+        yield value
+        buffer = skip_spaces(buffer, chunks)
+        if buffer.startswith(']'):
+            return
+        if not buffer.startswith(','):
+            raise ValueError('ожидалась запятая или конец массива')
+        buffer = skip_spaces(buffer[1:], chunks)
+
+
+def read_rows(path, fields):
+    """Читаем строки из csv, json или jsonl как кортежи полей модели
+
+    Все форматы читаются потоком, json - по одному элементу массива.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8') as file:
+        if extension == '.csv':
+            records = csv.DictReader(file, delimiter=',')
+        elif extension == '.json':
+            records = read_json_array(file)
+        elif extension == '.jsonl':
+            records = (json.loads(line) for line in file if line.strip())
+        else:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        number = 0
+        try:
+            for number, record in enumerate(records, start=1):
+                yield tuple(record[field].strip() for field in fields)
+        except (KeyError, AttributeError, TypeError):
+            raise CommandError(
+                f'{path}, запись {number}: нужны поля {", ".join(fields)}'
+            )
+        except ValueError as error:
+            raise CommandError(
+                f'{path}, после записи {number}: некорректный json ({error})'
+            )
+
+
+def batches(rows, size):
+    """Разбиваем поток строк на пачки по size"""
+
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def bulk_insert(model, fields, batch):
+    """Вставляем пачку через bulk_create, пропуская существующие записи"""
+
+    model.objects.bulk_create(
+        (model(**dict(zip(fields, row))) for row in batch),
+        batch_size=len(batch), ignore_conflicts=True
+    )
+
+
+def copy_insert(model, fields, batch):
+    """Вставляем пачку через COPY во временную таблицу (PostgreSQL)"""
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field) for field in fields)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS load_data')
+        cursor.execute(
+            f'CREATE TEMP TABLE load_data ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY load_data ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT DISTINCT {columns} FROM load_data '
+            f'ON CONFLICT DO NOTHING'
+        )
 
 
 class Command(BaseCommand):
-    help = ("Загрузка data из data/*.csv."
+    help = ("Загрузка тегов и ингредиентов из csv, json или jsonl пачками, "
+            "файлы читаются потоком."
             "Запуск: python manage.py load_csv_data."
             "Подробнее об импорте в README.md.")
 
+    def add_arguments(self, parser):
+        for name, (model, fields, file) in models.items():
+            parser.add_argument(
+                f'--{name}', metavar='FILE',
+                help=f'Файл для {model.__name__} с полями '
+                     f'{", ".join(fields)}, по умолчанию data/{file}'
+            )
+        parser.add_argument(
+            '--only', choices=models.keys(),
+            help='Загрузить только одну модель'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки для вставки, по умолчанию 5000'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только прочитать и проверить файлы, ничего не записывать'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY на PostgreSQL'
+        )
+
     def handle(self, *args, **options):
-        print("Старт импорта")
-        start_time = datetime.datetime.now()
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        insert = bulk_insert
+        if connection.vendor == 'postgresql' and not options['no_copy']:
+            insert = copy_insert
+        for name, (model, fields, file) in models.items():
+            if options['only'] and options['only'] != name:
+                continue
+            path = options[name] or os.path.join(DATA_DIR, file)
+            self.load(model, fields, path, insert, options)
 
-        try:
-            for model, file in csv_files:
-                with open(
-                        f'recipes/management/data/{file}', encoding='utf-8'
-                ) as f:
-                    reader = csv.DictReader(f, delimiter=',')
-                    for row in reader:
-                        if model in fields:
-                            row[fields[model][2]] = row.pop(fields[model][0])
-                        obj, created = model.objects.get_or_create(**row)
-                        if created:
-                            print(f'{obj} загружен в таблицу {model.__name__}')
-                        print(
-                            f'{obj} уже загружен в таблицу {model.__name__}')
-
-            print(f"Загрузка данных завершена за"
-                  f" {(datetime.datetime.now() - start_time).total_seconds()} "
-                  f"сек.")
-
-        except Exception as error:
-            print(f"Сбой в работе импорта: {error}.")
-
-        finally:
-            print("Завершена работа импорта.")
+    def load(self, model, fields, path, insert, options):
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING(
+                f'{model.__name__}: файл {path} не найден, пропускаем'
+            ))
+            return
+        start_time = time.perf_counter()
+        count_before = model.objects.count()
+        rows = 0
+        for batch in batches(read_rows(path, fields), options['batch_size']):
+            if not options['dry_run']:
+                insert(model, fields, batch)
+            rows += len(batch)
+        added = model.objects.count() - count_before
+        if added:
+            reference.invalidate(model)
+        seconds = time.perf_counter() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f'{model.__name__}: {path} - прочитано {rows} строк, '
+            f'добавлено {added}{" (dry run)" if options["dry_run"] else ""} '
+            f'за {seconds:.2f} сек, {rows / (seconds or 1e-9):.0f} строк/сек'
+        ))
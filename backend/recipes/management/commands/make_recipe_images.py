@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand
+
+from recipes.images import make_variants
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = ("Расчет уменьшенных копий картинок рецептов."
+            "Запуск: python manage.py make_recipe_images [--all] "
+            "[--recipe ID ...].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe', type=int, nargs='+', dest='recipe_ids',
+            help='Посчитать копии только указанных рецептов'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать копии и у рецептов, где они уже есть'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.all()
+        if options['recipe_ids']:
+            recipes = recipes.filter(id__in=options['recipe_ids'])
+        if not options['all']:
+            recipes = recipes.filter(images={})
+        count = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            make_variants(recipe_id)
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Копии картинок посчитаны: {count} рецептов')
+        )
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipes
+from recipes.search import update_index
+
+
+class Command(BaseCommand):
+    help = ("Пересборка поискового индекса рецептов."
+            "Запуск: python manage.py rebuild_search_index "
+            "[--recipe ID ...].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe', type=int, nargs='+', dest='recipe_ids',
+            help='Пересобрать индекс только указанных рецептов'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.all()
+        if options['recipe_ids']:
+            recipes = recipes.filter(id__in=options['recipe_ids'])
+        count = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            update_index(recipe_id)
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Поисковый индекс обновлен: {count} рецептов')
+        )
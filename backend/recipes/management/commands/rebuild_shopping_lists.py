@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = ("Пересборка материализованных списков покупок."
+            "Запуск: python manage.py rebuild_shopping_lists [--user ID ...].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Пересобрать списки только указанных пользователей'
+        )
+
+    def handle(self, *args, **options):
+        count = shopping_list.rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Списки покупок пересобраны: {count} записей')
+        )
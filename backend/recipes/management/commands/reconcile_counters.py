@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = ("Сверка счетчиков избранного, списков покупок, рецептов и "
+            "подписчиков с данными."
+            "Запуск: python manage.py reconcile_counters [--check].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, завершиться с ошибкой при расхождениях'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = counters.reconcile(fix=not options['check'])
+        for field, count in mismatches.items():
+            self.stdout.write(f'{field}: расхождений {count}')
+        if options['check'] and any(mismatches.values()):
+            raise CommandError('Счетчики расходятся с данными')
+        self.stdout.write(self.style.SUCCESS('Счетчики сверены'))
@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from recipes import popular
+
+
+class Command(BaseCommand):
+    help = ("Пересчет рейтинга популярных рецептов."
+            "Запуск: python manage.py refresh_popular_recipes "
+            "[--period day|week|all ...].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period', nargs='+', choices=popular.WINDOWS.keys(),
+            help='Пересчитать только указанные периоды'
+        )
+
+    def handle(self, *args, **options):
+        for period, count in popular.refresh(options['period']).items():
+            self.stdout.write(f'{period}: изменено строк {count}')
+        self.stdout.write(self.style.SUCCESS('Рейтинг пересчитан'))
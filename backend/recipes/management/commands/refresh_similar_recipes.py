@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from recipes import similar
+
+
+class Command(BaseCommand):
+    help = ("Пересчет похожих рецептов по избранному и спискам покупок."
+            "Запуск: python manage.py refresh_similar_recipes "
+            "[--full] [--hours N].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты, а не только недавно добавленные'
+        )
+        parser.add_argument(
+            '--hours', type=int,
+            help='Окно недавних добавлений в часах без --full'
+        )
+
+    def handle(self, *args, **options):
+        count = similar.refresh(full=options['full'], hours=options['hours'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Похожие рецепты пересчитаны: {count}')
+        )
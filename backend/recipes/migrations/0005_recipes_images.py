@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredients_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='images',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Уменьшенные копии картинки'),
+        ),
+    ]
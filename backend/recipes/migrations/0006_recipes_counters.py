@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:59
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Favorite', 'recipe', 'recipes', 'Recipes', 'favorites_count'),
+    ('recipes', 'Cart', 'recipe', 'recipes', 'Recipes', 'shopping_cart_count'),
+    ('recipes', 'Recipes', 'author', 'users', 'User', 'recipes_count'),
+    ('users', 'Subscribe', 'author', 'users', 'User', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняем счетчики по текущим данным"""
+
+    for app, source, foreign_key, target_app, target, field in COUNTERS:
+        source = apps.get_model(app, source)
+        apps.get_model(target_app, target).objects.update(**{
+            field: Coalesce(Subquery(
+                source.objects.filter(
+                    **{foreign_key: OuterRef('pk')}
+                ).order_by().values(foreign_key).annotate(
+                    total=Count('pk')
+                ).values('total'),
+                output_field=IntegerField()
+            ), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipes_images'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавили в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавили в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
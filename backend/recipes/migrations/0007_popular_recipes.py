@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipes_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='PopularRecipe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Сутки'), ('week', 'Неделя'), ('all', 'Все время')], max_length=4, verbose_name='Период')),
+                ('favorites_count', models.PositiveIntegerField(verbose_name='Добавили в избранное')),
+                ('shopping_cart_count', models.PositiveIntegerField(verbose_name='Добавили в список покупок')),
+                ('score', models.PositiveIntegerField(verbose_name='Рейтинг')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='recipes.recipes', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Популярный рецепт',
+                'verbose_name_plural': 'Популярные рецепты',
+                'ordering': ('period', '-score', '-recipe_id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularrecipe',
+            index=models.Index(fields=['period', '-score'], name='popular_period_score'),
+        ),
+        migrations.AddConstraint(
+            model_name='popularrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'period'), name='unique popular recipe'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feeds(apps, schema_editor):
+    """Заполняем ленты последними рецептами авторов из подписок"""
+
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipes = apps.get_model('recipes', 'Recipes')
+    Subscribe = apps.get_model('users', 'Subscribe')
+    for user_id, author_id in Subscribe.objects.filter(
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('user_id', 'author_id').iterator():
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in Recipes.objects.filter(
+                author_id=author_id
+            ).order_by('-id').values_list(
+                'id', flat=True
+            )[:settings.FEED_MAX_LENGTH]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_popular_recipes'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipes', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique feed entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feed_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+POSTGRESQL_INDEX = 'recipes_search_document_gin'
+
+
+def get_documents(apps):
+    """Название, ингредиенты и описание каждого рецепта"""
+
+    Recipes = apps.get_model('recipes', 'Recipes')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ingredients = {}
+    for recipe_id, name in IngredientInRecipe.objects.order_by(
+        'ingredient__name'
+    ).values_list('recipe_id', 'ingredient__name').iterator():
+        ingredients.setdefault(recipe_id, []).append(name)
+    for recipe_id, name, text in Recipes.objects.values_list(
+        'id', 'name', 'text'
+    ).iterator():
+        yield recipe_id, name, ' '.join(ingredients.get(recipe_id, ())), text
+
+
+def create_index(apps, schema_editor):
+    """Заполняем документы и создаем индекс под базу"""
+
+    Recipes = apps.get_model('recipes', 'Recipes')
+    documents = list(get_documents(apps))
+    for recipe_id, *fields in documents:
+        Recipes.objects.filter(id=recipe_id).update(
+            search_document='\n'.join(fields)
+        )
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {POSTGRESQL_INDEX} ON recipes_recipes USING GIN '
+            f"(to_tsvector('russian'::regconfig, "
+            f"COALESCE(search_document, '')))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE recipes_search USING fts5('
+            'name, ingredients, text, '
+            'tokenize="unicode61 remove_diacritics 2")'
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO recipes_search (rowid, name, ingredients, text) '
+                'VALUES (%s, %s, %s, %s)', documents
+            )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRESQL_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipes_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Текст для поиска'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
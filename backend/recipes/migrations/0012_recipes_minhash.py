@@ -0,0 +1,114 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:24
+
+import hashlib
+import random
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Параметры и хеширование recipes.minhash на момент миграции
+PRIME = (1 << 61) - 1
+SEED = 25
+BANDS = 16
+ROWS = 4
+
+
+def get_coefficients(size):
+    generator = random.Random(SEED)
+    return [
+        (generator.randrange(1, PRIME), generator.randrange(PRIME))
+        for _ in range(size)
+    ]
+
+
+def get_features(ingredient_ids, tag_ids):
+    """Ингредиенты - четные числа, теги - нечетные"""
+
+    return {ingredient_id * 2 for ingredient_id in ingredient_ids} | {
+        tag_id * 2 + 1 for tag_id in tag_ids
+    }
+
+
+def get_signature(features, coefficients):
+    if not features:
+        return []
+    return [
+        min((a * feature + b) % PRIME for feature in features)
+        for a, b in coefficients
+    ]
+
+
+def get_buckets(signature):
+    """Хеши полос подписи {полоса: хеш}"""
+
+    return {
+        band: int.from_bytes(hashlib.blake2b(
+            repr(signature[band * ROWS:(band + 1) * ROWS]).encode(),
+            digest_size=8
+        ).digest(), 'big', signed=True)
+        for band in range(len(signature) // ROWS)
+    }
+
+
+def fill_signatures(apps, schema_editor):
+    """Считаем подписи и корзины уже созданных рецептов"""
+
+    Recipes = apps.get_model('recipes', 'Recipes')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    RecipeBucket = apps.get_model('recipes', 'RecipeBucket')
+    ingredients, tags = {}, {}
+    for recipe_id, ingredient_id in IngredientInRecipe.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator():
+        ingredients.setdefault(recipe_id, []).append(ingredient_id)
+    for recipe_id, tag_id in Recipes.tags.through.objects.values_list(
+        'recipes_id', 'tags_id'
+    ).iterator():
+        tags.setdefault(recipe_id, []).append(tag_id)
+    coefficients = get_coefficients(BANDS * ROWS)
+    for recipe_id in Recipes.objects.values_list('id', flat=True).iterator():
+        signature = get_signature(get_features(
+            ingredients.get(recipe_id, ()), tags.get(recipe_id, ())
+        ), coefficients)
+        Recipes.objects.filter(id=recipe_id).update(minhash=signature)
+        RecipeBucket.objects.bulk_create(
+            RecipeBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+            for band, bucket in get_buckets(signature).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='minhash',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='MinHash подпись'),
+        ),
+        migrations.CreateModel(
+            name='RecipeBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Хеш полосы')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_buckets', to='recipes.recipes', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipebucket',
+            index=models.Index(fields=['band', 'bucket'], name='recipe_bucket_band'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipebucket',
+            constraint=models.UniqueConstraint(fields=('recipe', 'band'), name='unique recipe bucket'),
+        ),
+        migrations.RunPython(fill_signatures, migrations.RunPython.noop),
+    ]
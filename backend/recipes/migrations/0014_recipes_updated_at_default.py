@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_favorite_cart_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipes',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='Дата изменения'),
+        ),
+    ]
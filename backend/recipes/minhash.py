@@ -0,0 +1,178 @@
+"""Похожие по составу рецепты: MinHash подписи и LSH индекс.
+
+Признаки рецепта - его ингредиенты и теги. Подпись - RECIPE_MINHASH_BANDS
+* RECIPE_MINHASH_ROWS минимумов хешей признаков (a * x + b) mod p с
+фиксированными a и b. Доля совпавших позиций двух подписей оценивает
+коэффициент Жаккара наборов признаков. Подпись хранится в Recipes.minhash
+и пересчитывается в RecipesSerializer.create и update.
+
+Для поиска без перебора всех рецептов подпись режется на полосы по
+RECIPE_MINHASH_ROWS позиций, хеш каждой полосы - строка RecipeBucket с
+индексом по полосе и хешу. Кандидаты - рецепты, совпавшие с рецептом хотя
+бы в одной полосе: при 16 полосах по 4 позиции рецепт со сходством 0.5
+попадает в кандидаты с вероятностью 0.64, со сходством 0.8 - почти
+всегда. Кандидаты отбираются по оценке сходства подписей.
+"""
+import hashlib
+import random
+from functools import lru_cache
+from itertools import combinations, groupby
+
+from django.conf import settings
+from django.db.models import Q
+
+from recipes.models import IngredientInRecipe, RecipeBucket, Recipes
+
+PRIME = (1 << 61) - 1
+SEED = 25
+BATCH_SIZE = 5000
+
+
+@lru_cache()
+def get_coefficients(size):
+    generator = random.Random(SEED)
+    return [
+        (generator.randrange(1, PRIME), generator.randrange(PRIME))
+        for _ in range(size)
+    ]
+
+
+def get_features(ingredient_ids, tag_ids):
+    """Ингредиенты - четные числа, теги - нечетные"""
+
+    return {ingredient_id * 2 for ingredient_id in ingredient_ids} | {
+        tag_id * 2 + 1 for tag_id in tag_ids
+    }
+
+
+def get_signature(features):
+    if not features:
+        return []
+    return [
+        min((a * feature + b) % PRIME for feature in features)
+        for a, b in get_coefficients(
+            settings.RECIPE_MINHASH_BANDS * settings.RECIPE_MINHASH_ROWS
+        )
+    ]
+
+
+def get_buckets(signature):
+    """Хеши полос подписи {полоса: хеш}"""
+
+    rows = settings.RECIPE_MINHASH_ROWS
+    return {
+        band: int.from_bytes(hashlib.blake2b(
+            repr(signature[band * rows:(band + 1) * rows]).encode(),
+            digest_size=8
+        ).digest(), 'big', signed=True)
+        for band in range(len(signature) // rows)
+    }
+
+
+def get_similarity(first, second):
+    """Оценка коэффициента Жаккара по подписям"""
+
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def save_buckets(recipe_id, signature):
+    """Меняем только корзины полос, хеш которых изменился"""
+
+    existing = dict(RecipeBucket.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('band', 'bucket'))
+    buckets = get_buckets(signature)
+    changed = [
+        band for band, bucket in existing.items()
+        if buckets.get(band) != bucket
+    ]
+    if changed:
+        RecipeBucket.objects.filter(
+            recipe_id=recipe_id, band__in=changed
+        ).delete()
+    RecipeBucket.objects.bulk_create(
+        RecipeBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+        for band, bucket in buckets.items() if existing.get(band) != bucket
+    )
+
+
+def update_recipe(recipe_id):
+    """Пересчитываем подпись и корзины рецепта по данным из базы"""
+
+    signature = get_signature(get_features(
+        IngredientInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True),
+        Recipes.tags.through.objects.filter(
+            recipes_id=recipe_id
+        ).values_list('tags_id', flat=True)
+    ))
+    Recipes.objects.filter(id=recipe_id).update(minhash=signature)
+    save_buckets(recipe_id, signature)
+
+
+def find_alike(recipe, threshold, limit):
+    """Рецепты, похожие по составу: [(id, сходство)] по убыванию"""
+
+    condition = Q()
+    for band, bucket in get_buckets(recipe.minhash).items():
+        condition |= Q(band=band, bucket=bucket)
+    if not condition:
+        return []
+    candidates = Recipes.objects.filter(
+        id__in=RecipeBucket.objects.filter(condition).values('recipe_id')
+    ).exclude(id=recipe.id).values_list('id', 'minhash')[
+        :settings.RECIPE_ALIKE_MAX_CANDIDATES
+    ]
+    scored = sorted(
+        (
+            (get_similarity(recipe.minhash, signature), recipe_id)
+            for recipe_id, signature in candidates
+        ),
+        reverse=True
+    )
+    return [
+        (recipe_id, score) for score, recipe_id in scored
+        if score >= threshold
+    ][:limit]
+
+
+def candidate_pairs(max_bucket):
+    """Пары рецептов с общей корзиной одним проходом по RecipeBucket
+
+    Корзины больше max_bucket рецептов пропускаются: это частые
+    сочетания ингредиентов, а не копии. Возвращаем (пары, пропущено).
+    """
+
+    rows = RecipeBucket.objects.order_by(
+        'band', 'bucket', 'recipe_id'
+    ).values_list('band', 'bucket', 'recipe_id').iterator()
+    pairs, skipped = set(), 0
+    for _, group in groupby(rows, key=lambda row: row[:2]):
+        recipe_ids = [row[2] for row in group]
+        if len(recipe_ids) > max_bucket:
+            skipped += 1
+        else:
+            pairs.update(combinations(recipe_ids, 2))
+    return pairs, skipped
+
+
+def find_duplicates(threshold, max_bucket):
+    """Пары почти одинаковых рецептов [(сходство, id, id)] и пропуски"""
+
+    pairs, skipped = candidate_pairs(max_bucket)
+    recipe_ids = sorted({recipe_id for pair in pairs for recipe_id in pair})
+    signatures = {}
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        signatures.update(Recipes.objects.filter(
+            id__in=recipe_ids[start:start + BATCH_SIZE]
+        ).values_list('id', 'minhash'))
+    duplicates = [
+        (get_similarity(signatures[first], signatures[second]), first, second)
+        for first, second in pairs
+    ]
+    return sorted(
+        (row for row in duplicates if row[0] >= threshold), reverse=True
+    ), skipped
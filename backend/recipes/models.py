@@ -1,10 +1,11 @@
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from recipes.validators import (validate_amount, validate_cooking_time,
                                 validate_slug)
-from users.models import User
+from users.models import Subscribe, User
 
 
 class Ingredients(models.Model):
@@ -58,6 +59,48 @@ class Tags(models.Model):
         return self.name
 
 
+class RecipesQuerySet(models.QuerySet):
+    """Кверисет рецептов"""
+
+    def add_user_annotations(self, user):
+        """Подгружаем связи и добавляем флаги избранного, покупок, подписки
+
+        Страница рецептов собирается фиксированным числом запросов
+        независимо от ее размера.
+        """
+
+        if user.is_authenticated:
+            is_subscribed = models.Exists(Subscribe.objects.filter(
+                user=user, author=models.OuterRef('pk')
+            ))
+            is_favorited = models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            ))
+            is_in_shopping_cart = models.Exists(Cart.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            ))
+        else:
+            is_subscribed = is_favorited = is_in_shopping_cart = models.Value(
+                False, output_field=models.BooleanField()
+            )
+        return self.prefetch_related(
+            models.Prefetch(
+                'author',
+                queryset=User.objects.annotate(is_subscribed=is_subscribed)
+            ),
+            'tags',
+            models.Prefetch(
+                'ingredientinrecipe_set',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        ).annotate(
+            is_favorited=is_favorited,
+            is_in_shopping_cart=is_in_shopping_cart
+        )
+
+
 class Recipes(models.Model):
     """Модель рецептов"""
 
@@ -66,6 +109,9 @@ class Recipes(models.Model):
     )
     text = models.TextField('Описание')
     image = models.ImageField('Картинка', upload_to='recipes/%Y/%m/%d/')
+    images = models.JSONField(
+        'Уменьшенные копии картинки', default=dict, blank=True
+    )
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления', validators=[validate_cooking_time]
     )
@@ -77,6 +123,24 @@ class Recipes(models.Model):
         User, on_delete=models.CASCADE,
         related_name='recipe_author', verbose_name='Автор'
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавили в избранное', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'Добавили в список покупок', default=0, editable=False
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения', default=timezone.now, editable=False,
+        db_index=True
+    )
+    search_document = models.TextField(
+        'Текст для поиска', blank=True, default='', editable=False
+    )
+    minhash = models.JSONField(
+        'MinHash подпись', default=list, blank=True, editable=False
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     REQUIRED_FIELDS = [
         'name', 'text', 'image', 'cooking_time',
@@ -91,6 +155,15 @@ class Recipes(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Обновляем дату изменения при каждом сохранении
+
+        Не auto_now: loaddata сохраняет без save() и берет default.
+        """
+
+        self.updated_at = timezone.now()
+        super().save(*args, **kwargs)
+
 
 class IngredientInRecipe(models.Model):
     """Модель ингредиентов в рецепте"""
@@ -129,6 +202,10 @@ class BaseModelFavoriteCart(models.Model):
     recipe = models.ForeignKey(
         Recipes, on_delete=models.CASCADE, verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField(
+        'Дата добавления', default=timezone.now, editable=False,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -159,3 +236,162 @@ class Cart(BaseModelFavoriteCart):
         default_related_name = 'cart'
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class PopularRecipe(models.Model):
+    """Модель рейтинга популярных рецептов за период
+
+    Заполняется командой refresh_popular_recipes, см. recipes.popular.
+    """
+
+    DAY = 'day'
+    WEEK = 'week'
+    ALL = 'all'
+    PERIODS = (
+        (DAY, 'Сутки'),
+        (WEEK, 'Неделя'),
+        (ALL, 'Все время'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipes, on_delete=models.CASCADE,
+        related_name='popularity', verbose_name='Рецепт'
+    )
+    period = models.CharField('Период', max_length=4, choices=PERIODS)
+    favorites_count = models.PositiveIntegerField('Добавили в избранное')
+    shopping_cart_count = models.PositiveIntegerField(
+        'Добавили в список покупок'
+    )
+    score = models.PositiveIntegerField('Рейтинг')
+
+    class Meta:
+        ordering = ('period', '-score', '-recipe_id')
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'period'], name='unique popular recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', '-score'], name='popular_period_score'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Модель записи в ленте подписок пользователя
+
+    Заполняется при публикации рецепта, см. recipes.feed.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed', verbose_name='пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipes, on_delete=models.CASCADE,
+        related_name='feed_entries', verbose_name='Рецепт'
+    )
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique feed entry'
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    """Модель похожего рецепта: добавившие рецепт добавляли и этот
+
+    Заполняется командой refresh_similar_recipes, см. recipes.similar.
+    """
+
+    recipe = models.ForeignKey(
+        Recipes, on_delete=models.CASCADE,
+        related_name='similar', verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipes, on_delete=models.CASCADE,
+        related_name='similar_to', verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique similar recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score'
+            )
+        ]
+
+
+class RecipeBucket(models.Model):
+    """Модель LSH корзины рецепта: хеш полосы его MinHash подписи
+
+    Заполняется при сохранении рецепта, см. recipes.minhash.
+    """
+
+    recipe = models.ForeignKey(
+        Recipes, on_delete=models.CASCADE,
+        related_name='minhash_buckets', verbose_name='Рецепт'
+    )
+    band = models.PositiveSmallIntegerField('Полоса')
+    bucket = models.BigIntegerField('Хеш полосы')
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'band'], name='unique recipe bucket'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['band', 'bucket'], name='recipe_bucket_band'
+            )
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок
+
+    Поддерживается инкрементально при изменении списка покупок и
+    ингредиентов рецептов, см. recipes.shopping_list.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_list', verbose_name='пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients, on_delete=models.CASCADE, verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique shopping list ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.amount}'
@@ -0,0 +1,105 @@
+"""Рейтинг популярных рецептов за сутки, неделю и все время.
+
+Рейтинг хранится в таблице PopularRecipe и пересчитывается командой
+refresh_popular_recipes (по расписанию, например cron раз в несколько
+минут). За окна считаются только добавления в избранное и списки покупок
+новее начала окна по индексу created_at, за все время берутся счетчики
+рецептов. В таблице меняются только строки, которые изменились.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from recipes.models import Cart, Favorite, PopularRecipe, Recipes
+
+WINDOWS = {
+    PopularRecipe.DAY: timedelta(days=1),
+    PopularRecipe.WEEK: timedelta(days=7),
+    PopularRecipe.ALL: None,
+}
+
+
+def get_score(favorites_count, shopping_cart_count):
+    return (
+        favorites_count * settings.POPULAR_RECIPES_FAVORITE_WEIGHT
+        + shopping_cart_count * settings.POPULAR_RECIPES_CART_WEIGHT
+    )
+
+
+def count_since(model, since):
+    """Число добавлений рецептов после since {recipe_id: число}"""
+
+    return dict(model.objects.filter(created_at__gte=since).values(
+        'recipe'
+    ).annotate(total=Count('id')).order_by().values_list('recipe', 'total'))
+
+
+def calculate(period, now):
+    """Лучшие рецепты периода [(recipe_id, избранное, покупки)]"""
+
+    window = WINDOWS[period]
+    if window is None:
+        rows = Recipes.objects.filter(
+            Q(favorites_count__gt=0) | Q(shopping_cart_count__gt=0)
+        ).annotate(score=get_score(
+            F('favorites_count'), F('shopping_cart_count')
+        )).order_by('-score', '-id').values_list(
+            'id', 'favorites_count', 'shopping_cart_count'
+        )[:settings.POPULAR_RECIPES_LIMIT]
+        return list(rows)
+    favorites = count_since(Favorite, now - window)
+    carts = count_since(Cart, now - window)
+    rows = [
+        (recipe_id, favorites.get(recipe_id, 0), carts.get(recipe_id, 0))
+        for recipe_id in {*favorites, *carts}
+    ]
+    rows.sort(key=lambda row: (-get_score(*row[1:]), -row[0]))
+    return rows[:settings.POPULAR_RECIPES_LIMIT]
+
+
+def refresh_period(period, now):
+    """Переносим рейтинг периода в таблицу, возвращаем число изменений"""
+
+    existing = {
+        row.recipe_id: row
+        for row in PopularRecipe.objects.filter(period=period)
+    }
+    new, changed = [], []
+    for recipe_id, favorites_count, shopping_cart_count in calculate(
+        period, now
+    ):
+        row = existing.pop(recipe_id, None) or PopularRecipe(
+            recipe_id=recipe_id, period=period
+        )
+        values = (
+            favorites_count, shopping_cart_count,
+            get_score(favorites_count, shopping_cart_count)
+        )
+        if row.pk and values == (
+            row.favorites_count, row.shopping_cart_count, row.score
+        ):
+            continue
+        row.favorites_count, row.shopping_cart_count, row.score = values
+        (changed if row.pk else new).append(row)
+    PopularRecipe.objects.filter(
+        id__in=[row.id for row in existing.values()]
+    ).delete()
+    PopularRecipe.objects.bulk_update(
+        changed, ['favorites_count', 'shopping_cart_count', 'score']
+    )
+    PopularRecipe.objects.bulk_create(new)
+    return len(existing) + len(changed) + len(new)
+
+
+@transaction.atomic
+def refresh(periods=None, now=None):
+    """Пересчитываем рейтинги, возвращаем {период: число изменений}"""
+
+    now = now or timezone.now()
+    return {
+        period: refresh_period(period, now)
+        for period in periods or WINDOWS
+    }
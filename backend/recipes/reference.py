@@ -0,0 +1,99 @@
+"""Кеш справочников: теги и ингредиенты.
+
+Снимок справочника хранится в памяти процесса вместе с построенными по
+нему структурами (готовый JSON, индекс автодополнения и т.п.). Версия
+снимка лежит в кеше Django: сигналы меняют ее при изменении записей, и
+процессы, которые видят новую версию, перечитывают справочник. С
+локальным кешем по умолчанию версия своя у каждого процесса, поэтому
+снимок дополнительно устаревает через REFERENCE_CACHE_TIMEOUT. Для
+нескольких воркеров стоит настроить общий бэкенд кеша (CACHE_BACKEND).
+digest - хеш строк снимка, по нему считаются ETag ответов справочника.
+"""
+import hashlib
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ReferenceData:
+    """Снимок справочника и построенные по нему структуры"""
+
+    def __init__(self, model, version):
+        self.model = model
+        self.version = version
+        self.loaded = time.monotonic()
+        self.fields = [
+            field.attname for field in model._meta.concrete_fields
+        ]
+        self.rows = list(
+            model.objects.values_list(*self.fields).iterator()
+        )
+        self.digest = hashlib.sha1(repr(self.rows).encode()).hexdigest()
+        self._derived = {}
+
+    @property
+    def records(self):
+        return [dict(zip(self.fields, row)) for row in self.rows]
+
+    @property
+    def ids(self):
+        return self.derive('ids', lambda data: frozenset(
+            row[0] for row in data.rows
+        ))
+
+    def derive(self, name, factory):
+        """Структура, построенная по снимку, считается один раз на версию"""
+
+        if name not in self._derived:
+            self._derived[name] = factory(self)
+        return self._derived[name]
+
+    def expired(self):
+        return (
+            time.monotonic() - self.loaded > settings.REFERENCE_CACHE_TIMEOUT
+        )
+
+
+_snapshots = {}
+
+
+def get_cache():
+    return caches[settings.REFERENCE_CACHE_ALIAS]
+
+
+def version_key(model):
+    return f'reference:{model._meta.label_lower}:version'
+
+
+def get_version(model):
+    """Текущая версия справочника в общем кеше"""
+
+    return get_cache().get_or_set(
+        version_key(model), uuid4().hex, timeout=None
+    )
+
+
+def get(model):
+    """Актуальный снимок справочника model"""
+
+    version = get_version(model)
+    data = _snapshots.get(model)
+    if data is None or data.version != version or data.expired():
+        data = ReferenceData(model, version)
+        _snapshots[model] = data
+    return data
+
+
+def invalidate(model):
+    """Меняем версию справочника после изменения его записей"""
+
+    _snapshots.pop(model, None)
+    get_cache().set(version_key(model), uuid4().hex, timeout=None)
+
+
+def clear():
+    """Сбрасываем снимки процесса"""
+
+    _snapshots.clear()
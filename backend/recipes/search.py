@@ -0,0 +1,165 @@
+"""Полнотекстовый поиск рецептов по названию, ингредиентам и описанию.
+
+Текст для поиска собирается в Recipes.search_document после сохранения
+рецепта (сигнал recipes.signals). На PostgreSQL поиск идет по GIN индексу
+to_tsvector('russian', ...) из миграции 0010: русский стемминг,
+ранжирование ts_rank и подсветка ts_headline. На SQLite документ
+дублируется в таблицу FTS5 recipes_search, ранжирование по bm25 с весами
+колонок и подсветка snippet(). Стемминга для русского в FTS5 нет, поэтому
+слова запроса ищутся как префиксы. На остальных базах - icontains по
+документу без ранжирования.
+
+База подсвечивает найденные слова символами из области для частного
+использования, которые вырезаются из текста при индексации. render_snippet
+экранирует HTML во фрагменте и только потом заменяет их на теги <b>, чтобы
+разметка из текста рецепта не попала в ответ.
+"""
+import re
+from html import escape
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, CharField, FloatField, Value, When
+
+from recipes.models import IngredientInRecipe, Recipes
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_search'
+START_SELECTION = '\ue000'
+STOP_SELECTION = '\ue001'
+SELECTIONS = {START_SELECTION: '<b>', STOP_SELECTION: '</b>'}
+
+
+def strip_selections(text):
+    return text.replace(START_SELECTION, '').replace(STOP_SELECTION, '')
+
+
+def render_snippet(snippet):
+    """Фрагмент с найденными словами в тегах <b>, остальное экранировано"""
+
+    if not snippet:
+        return snippet
+    return re.sub(
+        f'[{START_SELECTION}{STOP_SELECTION}]',
+        lambda match: SELECTIONS[match.group()], escape(snippet)
+    )
+
+
+def get_fields(recipe_id):
+    """Название, ингредиенты и описание рецепта для индекса"""
+
+    row = Recipes.objects.filter(id=recipe_id).values_list(
+        'name', 'text'
+    ).first()
+    if row is None:
+        return None
+    ingredients = ' '.join(IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient__name', flat=True).order_by('ingredient__name'))
+    return tuple(
+        strip_selections(field) for field in (row[0], ingredients, row[1])
+    )
+
+
+def update_index(recipe_id):
+    """Обновляем поисковый документ рецепта"""
+
+    fields = get_fields(recipe_id)
+    if fields is None:
+        return
+    Recipes.objects.filter(id=recipe_id).update(
+        search_document='\n'.join(fields)
+    )
+    if connection.vendor == 'sqlite':
+        delete_index(recipe_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+                f'VALUES (%s, %s, %s, %s)', [recipe_id, *fields]
+            )
+
+
+def delete_index(recipe_id):
+    """Убираем рецепт из таблицы FTS5 (SQLite)"""
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id]
+            )
+
+
+def postgresql_search(queryset, query):
+    # django.contrib.postgres требует psycopg2, который нужен только на PG
+    from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                                SearchRank, SearchVector)
+
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type='websearch'
+    )
+    vector = SearchVector('search_document', config=SEARCH_CONFIG)
+    return queryset.annotate(search_vector=vector).filter(
+        search_vector=search_query
+    ).annotate(
+        search_rank=SearchRank(vector, search_query),
+        search_snippet=SearchHeadline(
+            'search_document', search_query, config=SEARCH_CONFIG,
+            start_sel=START_SELECTION, stop_sel=STOP_SELECTION,
+            max_fragments=2
+        )
+    )
+
+
+def fts_match(query):
+    """Строки таблицы FTS5: id рецепта, ранг bm25 и фрагмент с подсветкой"""
+
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}, 10.0, 5.0, 1.0), '
+            f"snippet({FTS_TABLE}, -1, '{START_SELECTION}', "
+            f"'{STOP_SELECTION}', '…', 12) "
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY 2 LIMIT %s',
+            [' '.join(f'"{term}"*' for term in terms),
+             settings.RECIPES_SEARCH_MAX_RESULTS]
+        )
+        return cursor.fetchall()
+
+
+def sqlite_search(queryset, query):
+    rows = fts_match(query)
+    return queryset.filter(id__in=[row[0] for row in rows]).annotate(
+        search_rank=Case(
+            *[When(id=row[0], then=Value(-row[1])) for row in rows],
+            output_field=FloatField()
+        ),
+        search_snippet=Case(
+            *[When(id=row[0], then=Value(row[2])) for row in rows],
+            output_field=CharField()
+        )
+    )
+
+
+def search(queryset, query):
+    """Рецепты, подходящие под запрос, от самых релевантных
+
+    У рецептов есть search_rank и search_snippet - фрагменты текста с
+    найденными словами между START_SELECTION и STOP_SELECTION, в ответ
+    они идут через render_snippet.
+    """
+
+    if connection.vendor == 'postgresql':
+        queryset = postgresql_search(queryset, query)
+    elif connection.vendor == 'sqlite':
+        queryset = sqlite_search(queryset, query)
+    else:
+        queryset = queryset.filter(
+            search_document__icontains=query
+        ).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value('', output_field=CharField())
+        )
+    return queryset.order_by('-search_rank', '-id')
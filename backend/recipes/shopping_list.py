@@ -0,0 +1,169 @@
+"""Материализованные списки покупок пользователей.
+
+Таблица ShoppingListItem хранит суммарное количество каждого ингредиента
+в списке покупок пользователя. Она обновляется приращениями при
+добавлении и удалении рецептов из списка покупок и при изменении
+ингредиентов рецепта, поэтому скачивание списка сводится к чтению.
+
+Приращения применяют сигналы моделей Cart и IngredientInRecipe
+(recipes.signals), так что список поддерживают и админка, и ORM. При
+каскадном удалении рецепта строки Cart и IngredientInRecipe удаляются
+пачками по моделям, post_delete каждой пачки приходит после ее удаления.
+Обработчики читают текущие строки другой модели, поэтому вклад рецепта
+вычитает та пачка, что удалена первой, а вторая уже ничего не находит.
+Bulk-операции сигналов не шлют, их изменения передаются в change_recipe
+явно.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Greatest
+
+from recipes.models import Cart, IngredientInRecipe, ShoppingListItem
+
+
+def get_recipe_amounts(recipe_id):
+    """Количества ингредиентов рецепта {ingredient_id: amount}"""
+
+    return dict(IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', 'amount').order_by())
+
+
+def pairs_filter(pairs):
+    """Условие на строки списков покупок по парам (user_id, ingredient_id)"""
+
+    ingredients_by_user = defaultdict(set)
+    for user_id, ingredient_id in pairs:
+        ingredients_by_user[user_id].add(ingredient_id)
+    return reduce(or_, (
+        Q(user_id=user_id, ingredient_id__in=ingredient_ids)
+        for user_id, ingredient_ids in sorted(ingredients_by_user.items())
+    ))
+
+
+def apply_changes(changes):
+    """Применяем приращения {(user_id, ingredient_id): delta}
+
+    Недостающие строки вставляются с нулем и ignore_conflicts, затем
+    количество меняется через F('amount') + delta. Так одновременные
+    добавления одного ингредиента не упираются в уникальность строки и
+    не теряют приращений. Строки с нулем удаляются.
+    """
+
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    pairs_by_delta = defaultdict(list)
+    for key, delta in changes.items():
+        pairs_by_delta[delta].append(key)
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=0
+            ) for (user_id, ingredient_id), delta in changes.items()
+            if delta > 0
+        ], ignore_conflicts=True)
+        for delta, pairs in sorted(pairs_by_delta.items()):
+            ShoppingListItem.objects.filter(pairs_filter(pairs)).update(
+                amount=Greatest(F('amount') + delta, 0)
+            )
+        ShoppingListItem.objects.filter(
+            pairs_filter(changes), amount=0
+        ).delete()
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    """Добавляем ингредиенты рецепта в список покупок пользователя"""
+
+    apply_changes({
+        (user_id, ingredient_id): sign * amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+    })
+
+
+def remove_recipe(user_id, recipe_id):
+    """Убираем ингредиенты рецепта из списка покупок пользователя"""
+
+    add_recipe(user_id, recipe_id, sign=-1)
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносим изменение ингредиентов рецепта в списки покупок"""
+
+    deltas = {
+        ingredient_id: new_amounts.get(ingredient_id, 0)
+        - old_amounts.get(ingredient_id, 0)
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+    apply_changes({
+        (user_id, ingredient_id): delta
+        for user_id in Cart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+        for ingredient_id, delta in deltas.items()
+    })
+
+
+def calculate(user_ids=None):
+    """Считаем списки покупок заново {(user_id, ingredient_id): amount}"""
+
+    if user_ids is None:
+        queryset = IngredientInRecipe.objects.filter(
+            recipe__cart__isnull=False
+        )
+    else:
+        queryset = IngredientInRecipe.objects.filter(
+            recipe__cart__user__in=user_ids
+        )
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in queryset.values_list(
+            'recipe__cart__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+    }
+
+
+def stored(user_ids=None):
+    """Сохраненные списки покупок {(user_id, ingredient_id): amount}"""
+
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in queryset.values_list(
+            'user', 'ingredient', 'amount'
+        ).order_by().iterator()
+    }
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Пересобираем списки покупок, возвращаем число записей"""
+
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    queryset.delete()
+    items = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount
+        ) for (user_id, ingredient_id), amount in calculate(user_ids).items()
+    ]
+    ShoppingListItem.objects.bulk_create(items, batch_size=1000)
+    return len(items)
+
+
+def find_inconsistencies(user_ids=None):
+    """Расхождения [(user_id, ingredient_id, expected, actual)]"""
+
+    expected, actual = calculate(user_ids), stored(user_ids)
+    return sorted(
+        (*key, expected.get(key, 0), actual.get(key, 0))
+        for key in expected.keys() | actual.keys()
+        if expected.get(key, 0) != actual.get(key, 0)
+    )
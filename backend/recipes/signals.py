@@ -0,0 +1,169 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipes import (cook, counters, feed, images, reference, search,
+                     shopping_list, tasks)
+from recipes.models import (Cart, Favorite, IngredientInRecipe, Ingredients,
+                            Recipes, Tags)
+from users.models import Subscribe
+
+
+@receiver([post_save, post_delete], sender=Tags)
+@receiver([post_save, post_delete], sender=Ingredients)
+def invalidate_reference(sender, **kwargs):
+    """Меняем версию справочника после фиксации транзакции"""
+
+    transaction.on_commit(lambda: reference.invalidate(sender))
+
+
+@receiver(post_delete, sender=Ingredients)
+def invalidate_cook_index(sender, **kwargs):
+    """Удаление ингредиента меняет состав рецептов, индекс строим заново"""
+
+    transaction.on_commit(cook.invalidate)
+
+
+@receiver(post_delete, sender=Recipes)
+def delete_image_variants(sender, instance, **kwargs):
+    """Удаляем копии картинки удаленного рецепта"""
+
+    tasks.on_commit(images.delete_variants, instance.id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Recipes)
+@receiver(post_save, sender=Subscribe)
+def increment_counters(sender, instance, created, raw, **kwargs):
+    """Увеличиваем счетчики при создании строки
+
+    При загрузке фикстур (raw) счетчики сверяет reconcile_counters.
+    """
+
+    if created and not raw:
+        counters.change(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Cart)
+@receiver(post_delete, sender=Recipes)
+@receiver(post_delete, sender=Subscribe)
+def decrement_counters(sender, instance, **kwargs):
+    """Уменьшаем счетчики при удалении строки"""
+
+    counters.change(instance, -1)
+
+
+@receiver(post_save, sender=Subscribe)
+def add_author_to_feed(sender, instance, created, raw, **kwargs):
+    """Добавляем рецепты автора в ленту нового подписчика"""
+
+    if created and not raw:
+        feed.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def remove_author_from_feed(sender, instance, **kwargs):
+    """Убираем рецепты автора из ленты при отписке"""
+
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipes)
+def update_search_index(sender, instance, raw, **kwargs):
+    """Обновляем поисковый документ, когда записаны и ингредиенты"""
+
+    if not raw:
+        transaction.on_commit(lambda: search.update_index(instance.id))
+
+
+@receiver(post_delete, sender=Recipes)
+def delete_search_index(sender, instance, **kwargs):
+    """Убираем удаленный рецепт из поискового индекса"""
+
+    recipe_id = instance.id
+    transaction.on_commit(lambda: search.delete_index(recipe_id))
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def update_cook_index(sender, instance, raw=False, **kwargs):
+    """Обновляем ингредиенты рецепта в индексе подбора после фиксации"""
+
+    if not raw:
+        recipe_id = instance.id
+        transaction.on_commit(lambda: cook.update_recipe(recipe_id))
+
+
+@receiver(pre_save, sender=Cart)
+def remember_cart(sender, instance, raw, **kwargs):
+    """Запоминаем пользователя и рецепт строки до изменения"""
+
+    instance._old_cart = None
+    if instance.pk and not raw:
+        instance._old_cart = Cart.objects.filter(
+            pk=instance.pk
+        ).values_list('user_id', 'recipe_id').first()
+
+
+@receiver(post_save, sender=Cart)
+def add_cart_to_shopping_list(sender, instance, raw, **kwargs):
+    """Переносим рецепт в список покупок пользователя
+
+    При загрузке фикстур (raw) списки сверяет check_shopping_lists.
+    """
+
+    old = getattr(instance, '_old_cart', None)
+    new = (instance.user_id, instance.recipe_id)
+    if raw or old == new:
+        return
+    if old is not None:
+        shopping_list.remove_recipe(*old)
+    shopping_list.add_recipe(*new)
+
+
+@receiver(post_delete, sender=Cart)
+def remove_cart_from_shopping_list(sender, instance, **kwargs):
+    """Убираем рецепт из списка покупок пользователя
+
+    Если ингредиенты рецепта уже удалены каскадом, вычитать нечего.
+    """
+
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_ingredient_amount(sender, instance, raw, **kwargs):
+    """Запоминаем ингредиент и количество строки до изменения"""
+
+    instance._old_amount = None
+    if instance.pk and not raw:
+        instance._old_amount = IngredientInRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def update_shopping_lists_amount(sender, instance, raw, **kwargs):
+    """Переносим изменение количества в списки покупок рецепта"""
+
+    if raw:
+        return
+    old = getattr(instance, '_old_amount', None)
+    shopping_list.change_recipe(
+        instance.recipe_id, dict([old]) if old else {},
+        {instance.ingredient_id: instance.amount}
+    )
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def remove_ingredient_from_shopping_lists(sender, instance, **kwargs):
+    """Убираем удаленный ингредиент из списков покупок рецепта
+
+    Если строки Cart рецепта уже удалены каскадом, менять нечего.
+    """
+
+    shopping_list.change_recipe(
+        instance.recipe_id, {instance.ingredient_id: instance.amount}, {}
+    )
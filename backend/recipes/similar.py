@@ -0,0 +1,217 @@
+"""Похожие рецепты: добавившие этот рецепт добавляли и эти.
+
+Сходство двух рецептов - косинус между их векторами по пользователям.
+Рецепт в избранном дает вес SIMILAR_RECIPES_FAVORITE_WEIGHT, в списке
+покупок - SIMILAR_RECIPES_CART_WEIGHT, из двух берется больший. Для
+каждого рецепта в таблице SimilarRecipe хранятся SIMILAR_RECIPES_LIMIT
+соседей с наибольшим сходством и хотя бы SIMILAR_RECIPES_MIN_COMMON_USERS
+общими пользователями. Таблицу заполняет команда refresh_similar_recipes.
+
+Разреженная матрица сходства считается на numpy без циклов по парам:
+взаимодействия сортируются по пользователю, пары рецептов одного
+пользователя получаются самосоединением массивов через np.repeat, суммы
+по парам - np.unique и np.bincount. Рецепты обрабатываются пачками
+примерно по SIMILAR_RECIPES_MAX_PAIRS пар, у пользователя берутся последние
+SIMILAR_RECIPES_MAX_USER_ITEMS рецептов, чтобы самые активные не давали
+квадратичного числа пар.
+
+Без --full пересчитываются только рецепты пользователей, которые что-то
+добавили за SIMILAR_RECIPES_RECENT_HOURS часов: общие пользователи
+остальных пар не изменились. Удаления из избранного и изменение норм
+соседей учитывает полный пересчет, его стоит запускать реже.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import Cart, Favorite, SimilarRecipe
+
+
+class CoOccurrence:
+    """Взаимодействия, сгруппированные по пользователям, и нормы рецептов"""
+
+    def __init__(self, users, recipes, weights, times, max_user_items):
+        users = np.asarray(users, dtype=np.int64)
+        recipes = np.asarray(recipes, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        times = np.asarray(times, dtype=np.float64)
+        # Одна строка на пару пользователь-рецепт: с большим весом
+        order = np.lexsort((-weights, recipes, users))
+        users, recipes = users[order], recipes[order]
+        weights, times = weights[order], times[order]
+        first = np.ones(len(users), dtype=bool)
+        first[1:] = (users[1:] != users[:-1]) | (recipes[1:] != recipes[:-1])
+        users, recipes = users[first], recipes[first]
+        weights, times = weights[first], times[first]
+        # Последние max_user_items рецептов пользователя
+        order = np.lexsort((-times, users))
+        users, recipes, weights = users[order], recipes[order], weights[order]
+        starts, counts = self.group(users)
+        rank = np.arange(len(users)) - np.repeat(starts, counts)
+        keep = rank < max_user_items
+        users, recipes, weights = users[keep], recipes[keep], weights[keep]
+
+        self.user_ids, self.users = np.unique(users, return_inverse=True)
+        self.recipe_ids, self.items = np.unique(recipes, return_inverse=True)
+        self.weights = weights
+        starts, counts = self.group(self.users)
+        self.starts = np.repeat(starts, counts)
+        self.sizes = np.repeat(counts, counts)
+        self.norms = np.sqrt(np.bincount(
+            self.items, weights=weights ** 2, minlength=len(self.recipe_ids)
+        ))
+
+    @staticmethod
+    def group(values):
+        """Начала и длины групп подряд идущих равных значений"""
+
+        if not len(values):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        return starts, np.diff(np.r_[starts, len(values)])
+
+    def targets_of_users(self, user_ids):
+        """Маска рецептов, которые есть у пользователей user_ids"""
+
+        users = np.flatnonzero(np.isin(self.user_ids, user_ids))
+        mask = np.zeros(len(self.recipe_ids), dtype=bool)
+        mask[self.items[np.isin(self.users, users)]] = True
+        return mask
+
+    def chunks(self, targets, max_pairs):
+        """Пачки рецептов из маски targets примерно по max_pairs пар"""
+
+        costs = np.bincount(
+            self.items, weights=self.sizes, minlength=len(self.recipe_ids)
+        )
+        costs[~targets] = 0
+        chunk = (np.cumsum(costs) // max(max_pairs, 1)).astype(np.int64)
+        for number in np.unique(chunk[targets]):
+            yield np.flatnonzero(targets & (chunk == number))
+
+    def neighbours(self, items, limit, min_common_users):
+        """Лучшие соседи рецептов items: (рецепт, сосед, сходство)"""
+
+        mask = np.zeros(len(self.recipe_ids), dtype=bool)
+        mask[items] = True
+        rows = np.flatnonzero(mask[self.items])
+        repeats = self.sizes[rows]
+        left = np.repeat(rows, repeats)
+        right = np.repeat(self.starts[rows], repeats) + (
+            np.arange(repeats.sum())
+            - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        )
+        different = self.items[left] != self.items[right]
+        left, right = left[different], right[different]
+        keys, inverse = np.unique(
+            self.items[left] * len(self.recipe_ids) + self.items[right],
+            return_inverse=True
+        )
+        common = np.bincount(inverse)
+        products = np.bincount(
+            inverse, weights=self.weights[left] * self.weights[right]
+        )
+        keep = common >= min_common_users
+        keys, products = keys[keep], products[keep]
+        sources, targets = np.divmod(keys, len(self.recipe_ids))
+        scores = products / (self.norms[sources] * self.norms[targets])
+        order = np.lexsort((targets, -scores, sources))
+        sources, targets = sources[order], targets[order]
+        starts, counts = self.group(sources)
+        rank = np.arange(len(sources)) - np.repeat(starts, counts)
+        top = rank < limit
+        return (
+            self.recipe_ids[sources[top]], self.recipe_ids[targets[top]],
+            scores[order][top]
+        )
+
+
+def load(model, weight):
+    rows = model.objects.values_list('user_id', 'recipe_id', 'created_at')
+    columns = list(zip(*(
+        (user_id, recipe_id, created_at.timestamp())
+        for user_id, recipe_id, created_at in rows.iterator()
+    ))) or ((), (), ())
+    return (*columns, np.full(len(columns[0]), weight))
+
+
+def load_co_occurrence():
+    """Избранное и списки покупок в CoOccurrence"""
+
+    favorites = load(Favorite, settings.SIMILAR_RECIPES_FAVORITE_WEIGHT)
+    carts = load(Cart, settings.SIMILAR_RECIPES_CART_WEIGHT)
+    users, recipes, times, weights = (
+        np.concatenate([np.asarray(a), np.asarray(b)])
+        for a, b in zip(favorites, carts)
+    )
+    return CoOccurrence(
+        users, recipes, weights, times,
+        settings.SIMILAR_RECIPES_MAX_USER_ITEMS
+    )
+
+
+def recent_users(since):
+    return list({
+        *Favorite.objects.filter(created_at__gte=since).values_list(
+            'user_id', flat=True
+        ),
+        *Cart.objects.filter(created_at__gte=since).values_list(
+            'user_id', flat=True
+        ),
+    })
+
+
+@transaction.atomic
+def save(recipe_ids, sources, targets, scores):
+    """Заменяем соседей рецептов пачки"""
+
+    SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+    SimilarRecipe.objects.bulk_create(
+        (
+            SimilarRecipe(recipe_id=source, similar_id=target, score=score)
+            for source, target, score in zip(
+                sources.tolist(), targets.tolist(), scores.tolist()
+            )
+        ),
+        batch_size=settings.SIMILAR_RECIPES_BATCH_SIZE
+    )
+
+
+def delete_stale(recipe_ids):
+    """Убираем соседей рецептов, которых больше никто не добавлял"""
+
+    stale = list(set(SimilarRecipe.objects.values_list(
+        'recipe_id', flat=True
+    ).distinct()) - set(recipe_ids))
+    batch_size = settings.SIMILAR_RECIPES_BATCH_SIZE
+    for start in range(0, len(stale), batch_size):
+        SimilarRecipe.objects.filter(
+            recipe_id__in=stale[start:start + batch_size]
+        ).delete()
+    return len(stale)
+
+
+def refresh(full=False, hours=None):
+    """Пересчитываем похожие рецепты, возвращаем число рецептов"""
+
+    data = load_co_occurrence()
+    if full:
+        targets = np.ones(len(data.recipe_ids), dtype=bool)
+    else:
+        hours = hours or settings.SIMILAR_RECIPES_RECENT_HOURS
+        targets = data.targets_of_users(
+            recent_users(timezone.now() - timedelta(hours=hours))
+        )
+    count = 0
+    for items in data.chunks(targets, settings.SIMILAR_RECIPES_MAX_PAIRS):
+        save(data.recipe_ids[items].tolist(), *data.neighbours(
+            items, settings.SIMILAR_RECIPES_LIMIT,
+            settings.SIMILAR_RECIPES_MIN_COMMON_USERS
+        ))
+        count += len(items)
+    if full:
+        count += delete_stale(data.recipe_ids.tolist())
+    return count
@@ -0,0 +1,50 @@
+"""Фоновые задачи в пуле потоков процесса.
+
+Задачи ставятся после фиксации транзакции (on_commit), чтобы поток видел
+сохраненные данные. Число потоков задает BACKGROUND_WORKERS, при
+BACKGROUND_TASKS_SYNC задачи выполняются сразу в текущем потоке.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    """Пул потоков создается при первой задаче"""
+
+    return ThreadPoolExecutor(
+        max_workers=settings.BACKGROUND_WORKERS,
+        thread_name_prefix='background'
+    )
+
+
+def run(func, *args):
+    """Выполняем задачу в потоке пула и закрываем его соединения с базой"""
+
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Ошибка в фоновой задаче %s', func.__name__)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args):
+    """Отправляем задачу в пул или выполняем сразу"""
+
+    if settings.BACKGROUND_TASKS_SYNC:
+        func(*args)
+    else:
+        get_executor().submit(run, func, *args)
+
+
+def on_commit(func, *args):
+    """Ставим задачу после фиксации текущей транзакции"""
+
+    transaction.on_commit(lambda: submit(func, *args))
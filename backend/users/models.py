@@ -13,6 +13,12 @@ class User(AbstractUser, ValidateUsername):
     first_name = models.CharField('Имя', max_length=settings.FIRST_NAME)
     last_name = models.CharField('Фамилия', max_length=settings.LAST_NAME)
     password = models.CharField('Пароль', max_length=settings.PASSWORD)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name', 'password']
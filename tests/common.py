@@ -21,3 +21,23 @@ def auth_client(user):
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
     return client
+
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+
+def recipe_data(tags, ingredients, amount=1):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'image': IMAGE,
+        'cooking_time': 5,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient in ingredients
+        ],
+    }
@@ -33,4 +33,5 @@ assert get_version() == '3.2.16', 'Пожалуйста, используйте
 
 pytest_plugins = [
     'tests.fixtures.fixture_users',
+    'tests.fixtures.fixture_recipes',
 ]
@@ -0,0 +1,63 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+def background_tasks_sync(settings):
+    settings.BACKGROUND_TASKS_SYNC = True
+
+
+@pytest.fixture(autouse=True)
+def reset_reference_cache():
+    from django.core.cache import cache
+
+    from recipes import reference
+    cache.clear()
+    reference.clear()
+
+
+@pytest.fixture
+def tags():
+    from recipes.models import Tags
+    return [
+        Tags.objects.create(name='Завтрак', color='#6FFFF7', slug='zavtrak'),
+        Tags.objects.create(name='Обед', color='#FFC05B', slug='obed'),
+        Tags.objects.create(name='Ужин', color='#FF2121', slug='uzhin'),
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    from recipes.models import Ingredients
+    return [
+        Ingredients.objects.create(name='абрикосы', measurement_unit='г'),
+        Ingredients.objects.create(name='молоко', measurement_unit='мл'),
+        Ingredients.objects.create(name='яйца', measurement_unit='шт'),
+    ]
+
+
+def create_recipes(author, tags, ingredients, count):
+    from recipes.models import IngredientInRecipe, Recipes
+    recipes = []
+    for number in range(count):
+        recipe = Recipes.objects.create(
+            name=f'Рецепт {number}', text='Описание',
+            image='recipes/test.png', cooking_time=10, author=author
+        )
+        recipe.tags.set(tags)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, ingredient=ingredient, amount=number + 1
+            ) for ingredient in ingredients
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+@pytest.fixture
+def recipes(another_user, tags, ingredients):
+    return create_recipes(another_user, tags, ingredients, 8)
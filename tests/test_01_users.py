@@ -1,7 +1,12 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
+from tests.fixtures.fixture_recipes import create_recipes
+from users.models import Subscribe
+
 from .common import auth_client, create_users_api
 
 
@@ -302,3 +307,51 @@ class Test01UserAPI:
             f'Проверьте, что при POST запросе {self.url_password} удаляется '
             f'токен и возвращается статус {status.HTTP_204_NO_CONTENT}'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_subscriptions_batched(self, user, tags, ingredients):
+        url = '/api/users/subscriptions/?recipes_limit=2'
+        client_user = auth_client(user)
+        authors = [
+            get_user_model().objects.create_user(
+                username=f'author{number}', email=f'author{number}@test.ru',
+                first_name='Author', last_name='Author', password='1234567Test'
+            ) for number in range(6)
+        ]
+        for number, author in enumerate(authors):
+            create_recipes(author, tags, ingredients, number + 1)
+            Subscribe.objects.create(user=user, author=author)
+        Subscribe.objects.create(user=authors[0], author=authors[1])
+
+        with CaptureQueriesContext(connection) as context:
+            response = client_user.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        assert len(context.captured_queries) <= 5, (
+            f'Проверьте, что при GET запросе {url} подписки и рецепты '
+            f'авторов загружаются фиксированным числом запросов'
+        )
+        results = response.json()['results']
+        assert len(results) == 6, (
+            f'Проверьте, что при GET запросе {url} возвращаются подписки '
+            f'с пагинацией'
+        )
+        for data, author in zip(results, authors):
+            author_recipes = list(
+                author.recipe_author.values_list('id', flat=True)[:2]
+            )
+            assert [recipe['id'] for recipe in data['recipes']] == (
+                author_recipes), (
+                f'Проверьте, что при GET запросе {url} возвращаются последние '
+                f'рецепты именно этого автора с учетом recipes_limit'
+            )
+            assert data['recipes_count'] == author.recipe_author.count(), (
+                f'Проверьте, что при GET запросе {url} возвращается '
+                f'правильный recipes_count'
+            )
+            assert data['is_subscribed'], (
+                f'Проверьте, что при GET запросе {url} возвращается '
+                f'is_subscribed=True'
+            )
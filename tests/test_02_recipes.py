@@ -0,0 +1,285 @@
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from api.serializers import RecipesSerializer
+from recipes.models import (Cart, Favorite, IngredientInRecipe,
+                            Ingredients)
+from tests.common import auth_client, recipe_data
+from tests.fixtures.fixture_recipes import create_recipes
+from users.models import Subscribe
+
+
+class Test02RecipesAPI:
+
+    url_recipes = '/api/recipes/'
+    max_page_queries = 7
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        return len(context.captured_queries), response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_recipes_list_fixed_queries(self, user, recipes):
+        user_client = auth_client(user)
+        small, data = self.count_queries(
+            user_client, f'{self.url_recipes}?page=2'
+        )
+        assert len(data['results']) == 2, (
+            f'Проверьте, что при GET запросе {self.url_recipes} работает '
+            f'пагинация по 6 рецептов'
+        )
+        Favorite.objects.create(user=user, recipe=recipes[-1])
+        Cart.objects.create(user=user, recipe=recipes[-2])
+        Subscribe.objects.create(user=user, author=recipes[0].author)
+        cache.clear()
+        queries, data = self.count_queries(user_client, self.url_recipes)
+        assert len(data['results']) == 6, (
+            f'Проверьте, что при GET запросе {self.url_recipes} возвращается '
+            f'страница из 6 рецептов'
+        )
+        assert queries <= self.max_page_queries, (
+            f'Проверьте, что при GET запросе {self.url_recipes} страница '
+            f'рецептов собирается не более чем за {self.max_page_queries} '
+            f'запросов к базе, сейчас {queries}'
+        )
+        assert queries == small, (
+            f'Проверьте, что при GET запросе {self.url_recipes} число '
+            f'запросов к базе не зависит от числа рецептов на странице'
+        )
+        first, second = data['results'][0], data['results'][1]
+        assert first['is_favorited'] and not second['is_favorited'], (
+            f'Проверьте, что при GET запросе {self.url_recipes} возвращаете '
+            f'правильный флаг is_favorited'
+        )
+        assert second['is_in_shopping_cart'] and not first[
+            'is_in_shopping_cart'], (
+            f'Проверьте, что при GET запросе {self.url_recipes} возвращаете '
+            f'правильный флаг is_in_shopping_cart'
+        )
+        assert first['author']['is_subscribed'], (
+            f'Проверьте, что при GET запросе {self.url_recipes} возвращаете '
+            f'правильный флаг is_subscribed автора'
+        )
+        assert len(first['ingredients']) == 3 and len(first['tags']) == 3, (
+            f'Проверьте, что при GET запросе {self.url_recipes} возвращаете '
+            f'ингредиенты и теги рецептов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_recipe_detail_anonymous(self, client, recipes):
+        url = f'{self.url_recipes}{recipes[0].id}/'
+        queries, data = self.count_queries(client, url)
+        assert queries <= self.max_page_queries, (
+            f'Проверьте, что при GET запросе {url} рецепт собирается не более '
+            f'чем за {self.max_page_queries} запросов к базе'
+        )
+        assert not data['is_favorited'] and not data['is_in_shopping_cart'], (
+            f'Проверьте, что при GET запросе {url} без токена флаги '
+            f'is_favorited и is_in_shopping_cart равны False'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_validate_ingredients_and_tags_by_set(self, user, tags):
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(60)
+        )
+        ingredients = list(Ingredients.objects.all())
+        serializer = RecipesSerializer(
+            data=recipe_data(tags, ingredients),
+            context={'request': SimpleNamespace(user=user)}
+        )
+        with CaptureQueriesContext(connection) as context:
+            data = serializer.validate({})
+        assert len(context.captured_queries) == 2, (
+            'Проверьте, что ингредиенты и теги рецепта проверяются одним '
+            'запросом на каждый список'
+        )
+        assert len(data['ingredients']) == 60 and data['ingredients'][0] == {
+            'id': ingredients[0].id, 'amount': 1
+        }, 'Проверьте, что validate возвращает список ингредиентов рецепта'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_validation_errors_for_every_item(self, user, tags,
+                                                 ingredients):
+        data = recipe_data(tags, ingredients)
+        data['ingredients'] += [
+            {'id': 100500, 'amount': 1},
+            {'id': ingredients[0].id, 'amount': 2},
+            {'id': 100501, 'amount': 0},
+        ]
+        data['tags'] += [100500, tags[0].id]
+        response = auth_client(user).post(
+            self.url_recipes, data=data, format='json'
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что при POST запросе {self.url_recipes} с '
+            f'несуществующими ингредиентами возвращается статус '
+            f'{status.HTTP_400_BAD_REQUEST}'
+        )
+        errors = response.json()
+        assert set(errors['ingredients']) == {'3', '4', '5'}, (
+            f'Проверьте, что при POST запросе {self.url_recipes} ошибки '
+            f'возвращаются для каждого неверного ингредиента'
+        )
+        assert set(errors['tags']) == {'3', '4'}, (
+            f'Проверьте, что при POST запросе {self.url_recipes} ошибки '
+            f'возвращаются для каждого неверного тега'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_update_changes_only_edited_ingredients(self, user, tags):
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(40)
+        )
+        ingredients = list(Ingredients.objects.all())
+        user_client = auth_client(user)
+        data = recipe_data(tags, ingredients)
+        response = user_client.post(self.url_recipes, data=data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED, (
+            f'Проверьте, что при POST запросе {self.url_recipes} создается '
+            f'рецепт'
+        )
+        url = f'{self.url_recipes}{response.json()["id"]}/'
+        rows_before = set(
+            IngredientInRecipe.objects.values_list('id', flat=True)
+        )
+        data['ingredients'][0]['amount'] = 5
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.patch(url, data=data, format='json')
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при PATCH запросе {url} рецепт обновляется'
+        )
+        table = IngredientInRecipe._meta.db_table
+        writes = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if table in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        assert writes == ['UPDATE'], (
+            f'Проверьте, что при PATCH запросе {url} с одним измененным '
+            f'количеством выполняется только один UPDATE ингредиентов рецепта'
+        )
+        assert set(IngredientInRecipe.objects.values_list(
+            'id', flat=True
+        )) == rows_before, (
+            f'Проверьте, что при PATCH запросе {url} неизмененные строки '
+            f'ингредиентов не пересоздаются'
+        )
+        amounts = {
+            item['id']: item['amount']
+            for item in response.json()['ingredients']
+        }
+        assert amounts[ingredients[0].id] == 5, (
+            f'Проверьте, что при PATCH запросе {url} количество ингредиента '
+            f'обновляется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_cursor_pagination(self, client, recipes, tags):
+        url = f'{self.url_recipes}?pagination=cursor&tags={tags[0].slug}'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        data = response.json()
+        assert 'count' not in data and len(data['results']) == 6, (
+            f'Проверьте, что при GET запросе {url} возвращается страница '
+            f'без count'
+        )
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), f'Проверьте, что при GET запросе {url} не выполняется COUNT'
+        assert data['previous'] is None and 'cursor=' in data['next'], (
+            f'Проверьте, что при GET запросе {url} возвращается курсор '
+            f'следующей страницы'
+        )
+        next_page = client.get(data['next']).json()
+        ids = [recipe['id'] for recipe in data['results']]
+        ids += [recipe['id'] for recipe in next_page['results']]
+        assert ids == [recipe.id for recipe in reversed(recipes)], (
+            f'Проверьте, что при GET запросе {url} курсор проходит все '
+            f'рецепты по убыванию id'
+        )
+        assert next_page['next'] is None and 'tags=' in next_page[
+            'previous'], (
+            f'Проверьте, что при GET запросе {url} ссылки курсора сохраняют '
+            f'фильтры'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_cached_page_count(self, client, another_user, recipes,
+                                  tags, ingredients):
+        url = f'{self.url_recipes}?tags={tags[0].slug}&tags={tags[1].slug}'
+        assert client.get(url).json()['count'] == len(recipes)
+        with CaptureQueriesContext(connection) as context:
+            data = client.get(url).json()
+        assert data['count'] == len(recipes) and not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), (
+            f'Проверьте, что при повторном GET запросе {url} число рецептов '
+            f'берется из кеша'
+        )
+        create_recipes(another_user, tags[:1], ingredients, 1)
+        assert client.get(url).json()['count'] == len(recipes) + 1, (
+            f'Проверьте, что при GET запросе {url} после создания рецепта '
+            f'число рецептов обновляется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_tags_filter_modes(self, client, another_user, tags,
+                                  ingredients):
+        breakfast, lunch, dinner = tags
+        both = create_recipes(another_user, [breakfast, lunch], ingredients, 1)
+        only_lunch = create_recipes(another_user, [lunch], ingredients, 1)
+        create_recipes(another_user, [dinner], ingredients, 1)
+        cases = (
+            ('tags=zavtrak&tags=obed', both + only_lunch),
+            ('tags=zavtrak,obed&tags_mode=all', both),
+            ('tags=obed&tags=unknown', only_lunch + both),
+            ('tags=obed&tags=unknown&tags_mode=all', []),
+            ('tags=unknown', []),
+        )
+        for params, expected in cases:
+            url = f'{self.url_recipes}?{params}'
+            data = client.get(url).json()
+            assert sorted(
+                recipe['id'] for recipe in data['results']
+            ) == sorted(recipe.id for recipe in expected), (
+                f'Проверьте, что при GET запросе {url} возвращаются рецепты '
+                f'с нужными тегами'
+            )
+            assert data['count'] == len(expected), (
+                f'Проверьте, что при GET запросе {url} рецепты с '
+                f'несколькими тегами не дублируются'
+            )
+        response = client.get(f'{self.url_recipes}?tags=obed&tags_mode=x')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            'Проверьте, что неизвестный tags_mode возвращает статус '
+            f'{status.HTTP_400_BAD_REQUEST}'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_tags_filter_count_after_tag_change(self, client, another_user,
+                                                   tags, ingredients):
+        breakfast, lunch, _ = tags
+        recipe = create_recipes(another_user, [breakfast], ingredients, 1)[0]
+        url = f'{self.url_recipes}?tags={lunch.slug}'
+        data = client.get(url).json()
+        assert (data['count'], data['results']) == (0, [])
+        recipe.tags.add(lunch)
+        data = client.get(url).json()
+        assert data['count'] == 1 and [
+            item['id'] for item in data['results']
+        ] == [recipe.id], (
+            f'Проверьте, что при GET запросе {url} после изменения тегов '
+            f'рецепта число рецептов и страница обновляются'
+        )
@@ -0,0 +1,330 @@
+import importlib
+import re
+import sys
+from unittest import mock
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+from reportlab.pdfbase import pdfmetrics
+from rest_framework import status
+
+from api import pdf
+from recipes import shopping_list
+from recipes.models import Cart, Ingredients, ShoppingListItem
+from tests.common import auth_client, recipe_data
+
+
+class Test03ShoppingCart:
+
+    url_recipes = '/api/recipes/'
+
+    def shopping_list(self, user):
+        return dict(ShoppingListItem.objects.filter(
+            user=user
+        ).values_list('ingredient__name', 'amount'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_cart_updates_shopping_list(self, user, recipes):
+        client = auth_client(user)
+        for recipe in recipes[:2]:
+            url = f'{self.url_recipes}{recipe.id}/shopping_cart/'
+            response = client.post(url)
+            assert response.status_code == status.HTTP_201_CREATED, (
+                f'Проверьте, что при POST запросе {url} рецепт добавляется '
+                f'в список покупок'
+            )
+        assert self.shopping_list(user) == {
+            'абрикосы': 3, 'молоко': 3, 'яйца': 3
+        }, (
+            'Проверьте, что при добавлении рецептов в список покупок '
+            'количества ингредиентов суммируются'
+        )
+
+        client.delete(f'{self.url_recipes}{recipes[0].id}/shopping_cart/')
+        assert self.shopping_list(user) == {
+            'абрикосы': 2, 'молоко': 2, 'яйца': 2
+        }, (
+            'Проверьте, что при удалении рецепта из списка покупок '
+            'количества ингредиентов уменьшаются'
+        )
+
+        client.delete(f'{self.url_recipes}{recipes[1].id}/shopping_cart/')
+        assert not self.shopping_list(user), (
+            'Проверьте, что пустой список покупок не хранит ингредиенты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_recipe_change_updates_shopping_list(
+            self, user, another_user, tags, ingredients, recipes):
+        author_client = auth_client(another_user)
+        recipe = recipes[0]
+        auth_client(user).post(
+            f'{self.url_recipes}{recipe.id}/shopping_cart/'
+        )
+        url = f'{self.url_recipes}{recipe.id}/'
+        response = author_client.patch(
+            url, data=recipe_data(tags, ingredients[1:], amount=7),
+            format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при PATCH запросе {url} автор может изменить '
+            f'рецепт'
+        )
+        assert self.shopping_list(user) == {'молоко': 7, 'яйца': 7}, (
+            'Проверьте, что изменение ингредиентов рецепта обновляет списки '
+            'покупок пользователей'
+        )
+        assert not shopping_list.find_inconsistencies(), (
+            'Проверьте, что списки покупок согласованы с корзинами'
+        )
+
+        author_client.delete(url)
+        assert not self.shopping_list(user), (
+            'Проверьте, что удаление рецепта убирает его из списков покупок'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_check_and_rebuild_commands(self, user, recipes):
+        auth_client(user).post(
+            f'{self.url_recipes}{recipes[0].id}/shopping_cart/'
+        )
+        ShoppingListItem.objects.filter(user=user).update(amount=100)
+        assert len(shopping_list.find_inconsistencies()) == 3, (
+            'Проверьте, что проверка находит расхождения в списках покупок'
+        )
+        call_command('check_shopping_lists', '--fix')
+        assert not shopping_list.find_inconsistencies(), (
+            'Проверьте, что check_shopping_lists --fix устраняет расхождения'
+        )
+        ShoppingListItem.objects.all().delete()
+        call_command('rebuild_shopping_lists')
+        assert self.shopping_list(user) == {
+            'абрикосы': 1, 'молоко': 1, 'яйца': 1
+        }, (
+            'Проверьте, что rebuild_shopping_lists пересобирает списки покупок'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_download_multipage_pdf(self, user, recipes, settings):
+        settings.PDF_CHUNK_SIZE = 1024
+        url = f'{self.url_recipes}download_shopping_cart/'
+        client = auth_client(user)
+        response = client.get(url)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что при GET запросе {url} с пустым списком покупок '
+            f'возвращается статус {status.HTTP_400_BAD_REQUEST}'
+        )
+
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(80)
+        )
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user=user, ingredient=ingredient, amount=1)
+            for ingredient in Ingredients.objects.all()
+        )
+        Cart.objects.create(user=user, recipe=recipes[0])
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        assert response.streaming and response['Content-Type'] == (
+            'application/pdf'), (
+            f'Проверьте, что при GET запросе {url} pdf отдается частями'
+        )
+        chunks = list(response.streaming_content)
+        assert len(chunks) > 1 and all(
+            len(chunk) == settings.PDF_CHUNK_SIZE for chunk in chunks[:-1]
+        ), (
+            f'Проверьте, что при GET запросе {url} pdf отдается частями '
+            f'по PDF_CHUNK_SIZE'
+        )
+        content = b''.join(chunks)
+        assert content.startswith(b'%PDF'), (
+            f'Проверьте, что при GET запросе {url} возвращается pdf'
+        )
+        assert len(re.findall(rb'/Type /Page\b(?!s)', content)) > 1, (
+            f'Проверьте, что при GET запросе {url} длинный список покупок '
+            f'переносится на несколько страниц'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_download_formats(self, user, recipes):
+        url = f'{self.url_recipes}download_shopping_cart/'
+        client = auth_client(user)
+        client.post(f'{self.url_recipes}{recipes[0].id}/shopping_cart/')
+        expected = {
+            'txt': 'Список ингредиентов для рецептов\n'
+                   '• абрикосы - 1 г\n• молоко - 1 мл\n• яйца - 1 шт\n',
+            'csv': 'name,measurement_unit,amount\r\n'
+                   'абрикосы,г,1\r\nмолоко,мл,1\r\nяйца,шт,1\r\n',
+            'json': '[{"name": "абрикосы", "measurement_unit": "г", '
+                    '"amount": 1},{"name": "молоко", "measurement_unit": '
+                    '"мл", "amount": 1},{"name": "яйца", '
+                    '"measurement_unit": "шт", "amount": 1}]',
+        }
+        media_types = {
+            'txt': 'text/plain', 'csv': 'text/csv', 'json': 'application/json'
+        }
+        for export_format, content in expected.items():
+            for response in (
+                client.get(f'{url}?format={export_format}'),
+                client.get(url, HTTP_ACCEPT=media_types[export_format]),
+            ):
+                assert response.status_code == status.HTTP_200_OK, (
+                    f'Проверьте, что при GET запросе {url} можно выбрать '
+                    f'формат {export_format}'
+                )
+                assert response['Content-Type'].startswith(
+                    media_types[export_format]), (
+                    f'Проверьте, что при GET запросе {url} в формате '
+                    f'{export_format} возвращается правильный Content-Type'
+                )
+                assert b''.join(response.streaming_content).decode() == (
+                    content), (
+                    f'Проверьте, что при GET запросе {url} в формате '
+                    f'{export_format} возвращается список покупок'
+                )
+
+        response = client.get(url, HTTP_ACCEPT='application/xml')
+        assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE, (
+            f'Проверьте, что при GET запросе {url} с неизвестным форматом '
+            f'возвращается статус {status.HTTP_406_NOT_ACCEPTABLE}'
+        )
+        assert 'detail' in response.json(), (
+            f'Проверьте, что при GET запросе {url} ошибки отдаются в JSON'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_orm_changes_update_shopping_list(self, user, recipes):
+        url = f'{self.url_recipes}download_shopping_cart/'
+        recipe = recipes[0]
+        Cart.objects.create(user=user, recipe=recipe)
+        Cart.objects.create(user=user, recipe=recipes[1])
+        assert self.shopping_list(user) == {
+            'абрикосы': 3, 'молоко': 3, 'яйца': 3
+        }, (
+            'Проверьте, что добавление в список покупок через ORM '
+            'обновляет список покупок'
+        )
+
+        row = recipe.ingredientinrecipe_set.get(ingredient__name='молоко')
+        row.amount = 5
+        row.save()
+        recipe.ingredientinrecipe_set.filter(
+            ingredient__name='яйца'
+        ).delete()
+        assert self.shopping_list(user) == {
+            'абрикосы': 3, 'молоко': 7, 'яйца': 2
+        }, (
+            'Проверьте, что изменение ингредиентов рецепта через ORM '
+            'обновляет списки покупок'
+        )
+
+        recipe.delete()
+        recipes[1].delete()
+        assert not shopping_list.find_inconsistencies(), (
+            'Проверьте, что удаление рецепта через ORM обновляет списки '
+            'покупок'
+        )
+        response = auth_client(user).get(url)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что после удаления рецептов через ORM при GET '
+            f'запросе {url} возвращается статус '
+            f'{status.HTTP_400_BAD_REQUEST}'
+        )
+        assert response.json() == {
+            'errors': 'Нет рецептов в списке покупок'
+        }, (
+            f'Проверьте, что после удаления рецептов через ORM при GET '
+            f'запросе {url} список покупок пуст'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_pdf_fonts_and_header_cached(self, user, recipes):
+        url = f'{self.url_recipes}download_shopping_cart/'
+        assert django_settings.PDF_FONT_NAME in (
+            pdfmetrics.getRegisteredFontNames()), (
+            'Проверьте, что шрифт pdf регистрируется при старте приложения'
+        )
+        client = auth_client(user)
+        client.post(f'{self.url_recipes}{recipes[0].id}/shopping_cart/')
+        pdf.get_header_layout.cache_clear()
+        with mock.patch.object(pdfmetrics, 'registerFont') as register:
+            for _ in range(2):
+                response = client.get(url)
+                assert b''.join(response.streaming_content).startswith(
+                    b'%PDF'), (
+                    f'Проверьте, что при GET запросе {url} возвращается pdf'
+                )
+        assert not register.called, (
+            f'Проверьте, что при GET запросе {url} шрифт не регистрируется '
+            f'повторно'
+        )
+        cache_info = pdf.get_header_layout.cache_info()
+        assert (cache_info.misses, cache_info.hits) == (1, 1), (
+            'Проверьте, что раскладка шапки pdf считается один раз'
+        )
+
+    def test_07_wsgi_warm_up(self, settings):
+        for warm_up, calls in ((True, 1), (False, 0)):
+            settings.PDF_WARM_UP = warm_up
+            sys.modules.pop('backend.wsgi', None)
+            with mock.patch.object(pdf, 'warm_up') as patched:
+                importlib.import_module('backend.wsgi')
+            assert patched.call_count == calls, (
+                'Проверьте, что backend.wsgi прогревает pdf только при '
+                'PDF_WARM_UP'
+            )
+        pdf.get_header_layout.cache_clear()
+        pdf.warm_up()
+        assert pdf.get_header_layout.cache_info().currsize == 1, (
+            'Проверьте, что прогрев pdf кеширует раскладку шапки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_cascades_and_rollback(self, user, another_user, recipes):
+        client = auth_client(user)
+        for recipe in recipes[:2]:
+            client.post(f'{self.url_recipes}{recipe.id}/shopping_cart/')
+        recipe_id = recipes[0].id
+        failing = mock.Mock(side_effect=RuntimeError)
+        post_delete.connect(failing, sender=Cart, weak=False)
+        try:
+            with pytest.raises(RuntimeError):
+                recipes[0].delete()
+        finally:
+            post_delete.disconnect(failing, sender=Cart)
+        client.delete(f'{self.url_recipes}{recipe_id}/shopping_cart/')
+        assert self.shopping_list(user) == {
+            'абрикосы': 2, 'молоко': 2, 'яйца': 2
+        }, (
+            'Проверьте, что отмененное удаление рецепта не мешает потом '
+            'убрать его из списка покупок'
+        )
+
+        milk, apricots = (
+            Ingredients.objects.get(name=name).id
+            for name in ('молоко', 'абрикосы')
+        )
+        shopping_list.apply_changes({
+            (user.id, milk): -5, (user.id, apricots): 1
+        })
+        assert self.shopping_list(user) == {'абрикосы': 3, 'яйца': 2}, (
+            'Проверьте, что количество в списке покупок не уходит в минус, '
+            'а пустые строки удаляются'
+        )
+        call_command('rebuild_shopping_lists')
+
+        another_user.delete()
+        assert not self.shopping_list(user), (
+            'Проверьте, что удаление автора убирает его рецепты из списков '
+            'покупок'
+        )
+        assert not shopping_list.find_inconsistencies(), (
+            'Проверьте, что каскадное удаление оставляет списки покупок '
+            'согласованными'
+        )
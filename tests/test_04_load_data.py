@@ -0,0 +1,112 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+
+from recipes.management.commands.load_csv_data import read_json_array
+from recipes.models import Cart, Favorite, Ingredients, Recipes, Tags
+
+
+class Test04LoadData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_load_bundled_data(self):
+        out = StringIO()
+        call_command('load_csv_data', stdout=out)
+        assert Tags.objects.count() == 3, (
+            'Проверьте, что load_csv_data загружает теги из tags.csv'
+        )
+        ingredients = Ingredients.objects.count()
+        assert ingredients == 2188, (
+            'Проверьте, что load_csv_data загружает все ингредиенты из '
+            'ingredients.csv'
+        )
+        assert 'строк/сек' in out.getvalue(), (
+            'Проверьте, что load_csv_data сообщает скорость загрузки'
+        )
+        call_command('load_csv_data', '--batch-size', '100', stdout=out)
+        assert Ingredients.objects.count() == ingredients, (
+            'Проверьте, что повторный запуск load_csv_data не создает '
+            'дубликатов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_load_json_and_dry_run(self, tmp_path):
+        path = tmp_path / 'ingredients.json'
+        path.write_text(json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'вода', 'measurement_unit': 'мл'},
+        ]), encoding='utf-8')
+        call_command(
+            'load_csv_data', '--only', 'ingredients', '--ingredients',
+            str(path), '--dry-run', stdout=StringIO()
+        )
+        assert not Ingredients.objects.exists(), (
+            'Проверьте, что load_csv_data --dry-run ничего не записывает'
+        )
+        call_command(
+            'load_csv_data', '--only', 'ingredients', '--ingredients',
+            str(path), stdout=StringIO()
+        )
+        assert Ingredients.objects.count() == 2, (
+            'Проверьте, что load_csv_data загружает json и пропускает '
+            'повторы'
+        )
+        assert not Tags.objects.exists(), (
+            'Проверьте, что load_csv_data --only загружает одну таблицу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_bundled_fixtures(self):
+        # После flush тестовой базы типы содержимого создаются с другими id
+        call_command(
+            'loaddata', os.path.join(settings.BASE_DIR, 'fixtures.json'),
+            '--exclude', 'contenttypes', '--exclude', 'auth.permission',
+            '--exclude', 'admin',
+            stdout=StringIO()
+        )
+        assert Recipes.objects.filter(updated_at__isnull=False).count() == 8, (
+            'Проверьте, что loaddata fixtures.json загружает рецепты с датой '
+            'изменения'
+        )
+        for model, count in ((Favorite, 9), (Cart, 8)):
+            assert model.objects.filter(
+                created_at__isnull=False
+            ).count() == count, (
+                f'Проверьте, что loaddata fixtures.json загружает '
+                f'{model._meta.verbose_name_plural} с датой добавления'
+            )
+
+    def test_03_json_read_incrementally(self):
+        records = [
+            {'name': f'соль "{number}" ]', 'measurement_unit': 'г'}
+            for number in range(50)
+        ] + [1.5e3, None, []]
+        text = json.dumps(records, ensure_ascii=False, indent=2)
+        for chunk_size in (1, 2, 7, 64):
+            assert list(read_json_array(
+                StringIO(text), chunk_size
+            )) == records, (
+                'Проверьте, что json читается по частям без потери записей'
+            )
+        file = StringIO(text)
+        next(read_json_array(file, 64))
+        assert file.tell() < len(text) // 10, (
+            'Проверьте, что load_csv_data не читает json файл целиком'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_invalid_json(self, tmp_path):
+        path = tmp_path / 'ingredients.json'
+        path.write_text(
+            '[{"name": "соль", "measurement_unit": "г"},]', encoding='utf-8'
+        )
+        with pytest.raises(CommandError, match='некорректный json'):
+            call_command(
+                'load_csv_data', '--only', 'ingredients', '--ingredients',
+                str(path), '--dry-run', stdout=StringIO()
+            )
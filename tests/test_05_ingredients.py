@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from recipes.models import Ingredients, Tags
+
+
+class Test05IngredientsAPI:
+
+    url_ingredients = '/api/ingredients/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_autocomplete_ranking(self, client):
+        Ingredients.objects.bulk_create(
+            Ingredients(name=name, measurement_unit='г') for name in (
+                'сахарная пудра', 'ванильный сахар', 'сахар', 'соль',
+                'тростниковый сахар', 'сахарин'
+            )
+        )
+        url = f'{self.url_ingredients}?name=Сахар'
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        assert [item['name'] for item in response.json()] == [
+            'сахар', 'сахарин', 'сахарная пудра', 'ванильный сахар',
+            'тростниковый сахар'
+        ], (
+            f'Проверьте, что при GET запросе {url} совпадения по началу '
+            f'названия идут раньше совпадений по части названия'
+        )
+        assert set(response.json()[0]) == {
+            'id', 'name', 'measurement_unit'}, (
+            f'Проверьте, что при GET запросе {url} возвращаются поля '
+            f'ингредиента'
+        )
+
+        url = f'{self.url_ingredients}?name=сахар&limit=2'
+        assert len(client.get(url).json()) == 2, (
+            f'Проверьте, что при GET запросе {url} число подсказок '
+            f'ограничено параметром limit'
+        )
+
+        Ingredients.objects.create(name='сахарная вата', measurement_unit='г')
+        url = f'{self.url_ingredients}?name=сахарная'
+        assert [item['name'] for item in client.get(url).json()] == [
+            'сахарная вата', 'сахарная пудра'
+        ], (
+            f'Проверьте, что при GET запросе {url} новые ингредиенты сразу '
+            f'попадают в подсказки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reference_lists_cached(self, client, tags, ingredients):
+        for url, model in (
+            (self.url_ingredients, Ingredients), ('/api/tags/', Tags)
+        ):
+            assert len(client.get(url).json()) == 3, (
+                f'Проверьте, что при GET запросе {url} возвращается весь '
+                f'справочник'
+            )
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert not context.captured_queries, (
+                f'Проверьте, что при повторном GET запросе {url} справочник '
+                f'отдается из кеша без запросов к базе'
+            )
+            assert response['Content-Type'] == 'application/json', (
+                f'Проверьте, что при GET запросе {url} возвращается JSON'
+            )
+            obj = model.objects.first()
+            obj.name = 'новое название'
+            obj.save()
+            assert 'новое название' in [
+                item['name'] for item in client.get(url).json()
+            ], (
+                f'Проверьте, что после изменения записи GET запрос {url} '
+                f'возвращает обновленный справочник'
+            )
+        assert client.get('/api/tags/').json()[0] == {
+            'id': tags[0].id, 'name': 'новое название',
+            'color': tags[0].color, 'slug': tags[0].slug
+        }, (
+            'Проверьте, что при GET запросе /api/tags/ возвращаются все поля '
+            'тега'
+        )
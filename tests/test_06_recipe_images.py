@@ -0,0 +1,144 @@
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from django.conf import settings
+from PIL import Image
+from rest_framework import status
+
+from tests.common import auth_client, recipe_data
+
+
+def large_image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (2000, 1000), color).save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+def media_path(url):
+    return os.path.join(
+        settings.MEDIA_ROOT, url.split(settings.MEDIA_URL, 1)[1]
+    )
+
+
+class Test06RecipeImages:
+
+    url_recipes = '/api/recipes/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_variants_created_after_upload(self, user, tags,
+                                              ingredients):
+        data = recipe_data(tags, ingredients)
+        data['image'] = large_image('red')
+        user_client = auth_client(user)
+        response = user_client.post(
+            self.url_recipes, data=data, format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED, (
+            f'Проверьте, что при POST запросе {self.url_recipes} создается '
+            f'рецепт'
+        )
+        url = f'{self.url_recipes}{response.json()["id"]}/'
+        images = user_client.get(url).json()['images']
+        assert set(images) == set(settings.RECIPE_IMAGE_VARIANTS), (
+            f'Проверьте, что при GET запросе {url} возвращаются ссылки на '
+            f'все размеры картинки'
+        )
+        for name, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            assert set(images[name]) == {'webp', 'jpeg'}, (
+                f'Проверьте, что при GET запросе {url} возвращаются ссылки '
+                f'на картинку в форматах webp и jpeg'
+            )
+            with Image.open(media_path(images[name]['webp'])) as image:
+                assert image.size == (size, size // 2), (
+                    'Проверьте, что копии картинки уменьшаются с '
+                    'сохранением пропорций'
+                )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_variants_replaced_on_image_change(self, user, tags,
+                                                  ingredients):
+        user_client = auth_client(user)
+        data = recipe_data(tags, ingredients)
+        data['image'] = large_image('red')
+        recipe = user_client.post(
+            self.url_recipes, data=data, format='json'
+        ).json()
+        old_paths = [
+            media_path(url) for formats in recipe['images'].values()
+            for url in formats.values()
+        ]
+        data['image'] = large_image('blue')
+        url = f'{self.url_recipes}{recipe["id"]}/'
+        response = user_client.patch(url, data=data, format='json')
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при PATCH запросе {url} рецепт обновляется'
+        )
+        images = user_client.get(url).json()['images']
+        with Image.open(media_path(images['thumbnail']['jpeg'])) as image:
+            assert image.getpixel((0, 0))[2] > 200, (
+                f'Проверьте, что при PATCH запросе {url} копии считаются '
+                f'по новой картинке'
+            )
+        assert not any(os.path.exists(path) for path in old_paths), (
+            f'Проверьте, что при PATCH запросе {url} старые копии картинки '
+            f'удаляются'
+        )
+        user_client.delete(url)
+        assert not any(
+            os.path.exists(media_path(url)) for formats in images.values()
+            for url in formats.values()
+        ), 'Проверьте, что при удалении рецепта удаляются копии картинки'
+
+    def post_image(self, user_client, tags, ingredients, image):
+        data = recipe_data(tags, ingredients)
+        data['image'] = image
+        return user_client.post(
+            self.url_recipes, data=data, format='json'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_image_size_limits(self, settings, user, tags, ingredients):
+        settings.IMAGE_UPLOAD_MAX_SIZE = 1024
+        response = self.post_image(
+            auth_client(user), tags, ingredients, 'data:image/png;base64,' + 'A' * 4096
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что при POST запросе {self.url_recipes} картинка '
+            f'больше IMAGE_UPLOAD_MAX_SIZE отклоняется'
+        )
+        assert 'image' in response.json(), (
+            f'Проверьте, что при POST запросе {self.url_recipes} ошибка '
+            f'размера картинки возвращается в поле image'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_decompression_bomb_rejected(self, settings, user, tags,
+                                            ingredients):
+        settings.IMAGE_UPLOAD_MAX_PIXELS = 1_000_000
+        buffer = BytesIO()
+        Image.new('L', (1500, 1500)).save(buffer, 'PNG', optimize=True)
+        image = (
+            'data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode()
+        )
+        assert len(image) < 20_000
+        response = self.post_image(auth_client(user), tags, ingredients, image)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что при POST запросе {self.url_recipes} картинка '
+            f'больше IMAGE_UPLOAD_MAX_PIXELS отклоняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_invalid_base64_rejected(self, user, tags, ingredients):
+        user_client = auth_client(user)
+        for image in ('data:image/png;base64,!!!!', 'aGVsbG8gd29ybGQh'):
+            response = self.post_image(user_client, tags, ingredients, image)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+                f'Проверьте, что при POST запросе {self.url_recipes} '
+                f'некорректная картинка отклоняется'
+            )
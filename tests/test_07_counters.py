@@ -0,0 +1,65 @@
+import pytest
+from django.core.management import CommandError, call_command
+from rest_framework import status
+
+from recipes.models import Favorite, Recipes
+from tests.common import auth_client
+from users.models import Subscribe, User
+
+
+class Test07Counters:
+
+    url_recipes = '/api/recipes/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_counters_follow_changes(self, user, another_user, recipes):
+        client = auth_client(user)
+        recipe = recipes[0]
+        client.post(f'{self.url_recipes}{recipe.id}/favorite/')
+        client.post(f'{self.url_recipes}{recipe.id}/shopping_cart/')
+        response = client.post(f'/api/users/{another_user.id}/subscribe/')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()['recipes_count'] == len(recipes), (
+            'Проверьте, что в подписке возвращается число рецептов автора'
+        )
+        recipe.refresh_from_db()
+        another_user.refresh_from_db()
+        assert (recipe.favorites_count, recipe.shopping_cart_count) == (
+            1, 1
+        ), 'Проверьте, что счетчики избранного и списка покупок растут'
+        assert (another_user.recipes_count, another_user.followers_count) == (
+            len(recipes), 1
+        ), 'Проверьте, что счетчики рецептов и подписчиков автора растут'
+
+        client.delete(f'{self.url_recipes}{recipe.id}/favorite/')
+        client.delete(f'/api/users/{another_user.id}/subscribe/')
+        recipes[1].delete()
+        recipe.refresh_from_db()
+        another_user.refresh_from_db()
+        assert recipe.favorites_count == 0, (
+            'Проверьте, что счетчик избранного уменьшается при удалении'
+        )
+        assert (another_user.recipes_count, another_user.followers_count) == (
+            len(recipes) - 1, 0
+        ), 'Проверьте, что счетчики автора уменьшаются при удалении'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reconcile_counters(self, user, another_user, recipes):
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=recipe) for recipe in recipes[:3]
+        )
+        Subscribe.objects.bulk_create([
+            Subscribe(user=user, author=another_user)
+        ])
+        with pytest.raises(CommandError):
+            call_command('reconcile_counters', '--check')
+        call_command('reconcile_counters')
+        assert list(Recipes.objects.filter(
+            favorites_count=1
+        ).values_list('id', flat=True).order_by('id')) == [
+            recipe.id for recipe in recipes[:3]
+        ], 'Проверьте, что reconcile_counters исправляет счетчик избранного'
+        assert User.objects.get(id=another_user.id).followers_count == 1, (
+            'Проверьте, что reconcile_counters исправляет счетчик подписчиков'
+        )
+        call_command('reconcile_counters', '--check')
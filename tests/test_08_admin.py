@@ -0,0 +1,43 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Cart, Favorite
+from tests.fixtures.fixture_recipes import create_recipes
+from users.models import Subscribe
+
+
+class Test08Admin:
+
+    max_queries = 10
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что страница {url} открывается администратору'
+        )
+        return len(context.captured_queries)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_changelists_fixed_queries(self, client, admin, user,
+                                          another_user, tags, ingredients):
+        recipes = create_recipes(another_user, tags, ingredients, 100)
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=recipe) for recipe in recipes
+        )
+        Cart.objects.bulk_create(
+            Cart(user=user, recipe=recipe) for recipe in recipes
+        )
+        Subscribe.objects.create(user=user, author=another_user)
+        client.force_login(admin)
+        for url in (
+            '/admin/recipes/recipes/', '/admin/recipes/favorite/',
+            '/admin/recipes/cart/', '/admin/users/user/',
+            '/admin/users/subscribe/',
+        ):
+            queries = self.count_queries(client, url)
+            assert queries < self.max_queries, (
+                f'Проверьте, что страница {url} со 100 записями собирается '
+                f'меньше чем за {self.max_queries} запросов, сейчас {queries}'
+            )
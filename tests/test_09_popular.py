@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+
+from recipes.models import Cart, Favorite, PopularRecipe
+
+
+class Test09PopularRecipes:
+
+    url_popular = '/api/recipes/popular/'
+
+    def popular_ids(self, client, period):
+        url = f'{self.url_popular}?period={period}'
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_popular_by_period(self, client, user, another_user,
+                                  admin, recipes):
+        old, recent, cart_only = recipes[0], recipes[1], recipes[2]
+        for person in (user, another_user, admin):
+            Favorite.objects.create(user=person, recipe=old)
+        Favorite.objects.create(user=user, recipe=recent)
+        Cart.objects.create(user=user, recipe=cart_only)
+        Favorite.objects.filter(recipe=old).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+        call_command('refresh_popular_recipes')
+        assert self.popular_ids(client, 'day') == [recent.id, cart_only.id], (
+            'Проверьте, что рейтинг за сутки учитывает только новые '
+            'добавления и избранное весит больше списка покупок'
+        )
+        assert self.popular_ids(client, 'week') == [
+            old.id, recent.id, cart_only.id
+        ], 'Проверьте, что рейтинг за неделю учитывает добавления за 7 дней'
+        assert self.popular_ids(client, 'all')[0] == old.id
+
+        Favorite.objects.filter(recipe=old).delete()
+        call_command('refresh_popular_recipes', '--period', 'week')
+        assert not PopularRecipe.objects.filter(
+            period=PopularRecipe.WEEK, recipe=old
+        ).exists(), 'Проверьте, что рейтинг обновляется при пересчете'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_popular_bad_period(self, client):
+        response = client.get(f'{self.url_popular}?period=year')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+            f'Проверьте, что при GET запросе {self.url_popular} с неверным '
+            f'периодом возвращается статус {status.HTTP_400_BAD_REQUEST}'
+        )
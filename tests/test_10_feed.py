@@ -0,0 +1,75 @@
+import pytest
+from rest_framework import status
+
+from recipes.models import FeedEntry
+from tests.common import auth_client, recipe_data
+
+
+class Test10Feed:
+
+    url_feed = '/api/recipes/feed/'
+
+    def feed_ids(self, client):
+        ids, url = [], self.url_feed
+        while url:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK, (
+                f'Проверьте, что при GET запросе {url} возвращается статус '
+                f'{status.HTTP_200_OK}'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                f'Проверьте, что при GET запросе {url} лента читается '
+                f'курсором без подсчета записей'
+            )
+            ids += [recipe['id'] for recipe in data['results']]
+            url = data['next']
+        return ids
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_feed_fan_out_on_write(self, settings, user, another_user,
+                                      recipes, tags, ingredients):
+        settings.FEED_MAX_LENGTH = 5
+        settings.FEED_TRIM_SLACK = 0
+        client = auth_client(user)
+        assert self.feed_ids(client) == []
+        client.post(f'/api/users/{another_user.id}/subscribe/')
+        assert self.feed_ids(client) == [
+            recipe.id for recipe in recipes[::-1][:5]
+        ], 'Проверьте, что после подписки в ленте последние рецепты автора'
+
+        response = auth_client(another_user).post(
+            '/api/recipes/', data=recipe_data(tags, ingredients),
+            format='json'
+        )
+        new_id = response.json()['id']
+        ids = self.feed_ids(client)
+        assert ids[0] == new_id and len(ids) == 5, (
+            'Проверьте, что новый рецепт попадает в начало ленты '
+            'подписчика, а лента не длиннее FEED_MAX_LENGTH'
+        )
+        assert FeedEntry.objects.filter(user=user).count() == 5
+
+        client.delete(f'/api/users/{another_user.id}/subscribe/')
+        assert self.feed_ids(client) == [], (
+            'Проверьте, что после отписки рецепты автора пропадают из ленты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_feed_fan_out_on_read(self, settings, user, another_user,
+                                     recipes, tags, ingredients):
+        settings.FEED_FANOUT_MAX_FOLLOWERS = 0
+        client = auth_client(user)
+        client.post(f'/api/users/{another_user.id}/subscribe/')
+        auth_client(another_user).post(
+            '/api/recipes/', data=recipe_data(tags, ingredients),
+            format='json'
+        )
+        assert not FeedEntry.objects.exists(), (
+            'Проверьте, что рецепты популярных авторов не раскладываются '
+            'по лентам'
+        )
+        assert len(self.feed_ids(client)) == len(recipes) + 1, (
+            'Проверьте, что рецепты популярных авторов подмешиваются в ленту '
+            'при чтении'
+        )
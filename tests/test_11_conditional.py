@@ -0,0 +1,130 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from api.mixins import check_conditional_cache
+from recipes.models import Favorite, Tags
+from tests.common import auth_client
+
+
+class Test11ConditionalRequests:
+
+    url_recipes = '/api/recipes/'
+    url_tags = '/api/tags/'
+
+    @pytest.fixture(autouse=True)
+    def conditional_responses(self, settings):
+        settings.CONDITIONAL_RESPONSES = True
+
+    def revalidate(self, client, url, etag):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(context.captured_queries)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_recipe_detail_not_modified(self, user, recipes):
+        client = auth_client(user)
+        url = f'{self.url_recipes}{recipes[0].id}/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag.startswith('"') and response.has_header(
+            'Last-Modified'
+        ), f'Проверьте, что при GET запросе {url} отдаются ETag и Last-Modified'
+        response, queries = self.revalidate(client, url, etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED, (
+            f'Проверьте, что при GET запросе {url} с актуальным ETag '
+            f'возвращается статус {status.HTTP_304_NOT_MODIFIED}'
+        )
+        assert queries <= 2, (
+            f'Проверьте, что при GET запросе {url} ответ 304 отдается без '
+            f'выборки рецепта и сериализации'
+        )
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        response, _ = self.revalidate(client, url, etag)
+        assert response.status_code == status.HTTP_200_OK and response.json()[
+            'is_favorited'], (
+            f'Проверьте, что при GET запросе {url} ETag меняется после '
+            f'добавления рецепта в избранное'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_recipe_list_weak_etag(self, client, another_user, recipes):
+        url = f'{self.url_recipes}?page=2'
+        etag = client.get(url)['ETag']
+        assert etag.startswith('W/"'), (
+            f'Проверьте, что при GET запросе {url} отдается слабый ETag'
+        )
+        response, _ = self.revalidate(client, url, etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        recipes[1].delete()
+        response, _ = self.revalidate(client, url, etag)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} ETag меняется после '
+            f'удаления рецепта'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reference_not_modified(self, client, tags):
+        etag = client.get(self.url_tags)['ETag']
+        response, queries = self.revalidate(client, self.url_tags, etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED and (
+            queries == 0
+        ), (
+            f'Проверьте, что при GET запросе {self.url_tags} с актуальным '
+            f'ETag ответ 304 отдается без запросов к базе'
+        )
+        Tags.objects.create(name='Перекус', color='#000000', slug='snack')
+        response, _ = self.revalidate(client, self.url_tags, etag)
+        assert response.status_code == status.HTTP_200_OK and len(
+            response.json()
+        ) == len(tags) + 1, (
+            f'Проверьте, что при GET запросе {self.url_tags} ETag меняется '
+            f'после изменения тегов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_recipe_detail_invalid_id(self, client):
+        for pk in ('abc', '100500'):
+            url = f'{self.url_recipes}{pk}/'
+            response = client.get(url)
+            assert response.status_code == status.HTTP_404_NOT_FOUND, (
+                f'Проверьте, что при GET запросе {url} возвращается статус '
+                f'{status.HTTP_404_NOT_FOUND}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_reference_reload_changes_etag(self, client, tags, settings):
+        etag = client.get(self.url_tags)['ETag']
+        Tags.objects.filter(id=tags[0].id).update(name='Перекус')
+        settings.REFERENCE_CACHE_TIMEOUT = -1
+        response, _ = self.revalidate(client, self.url_tags, etag)
+        assert response.status_code == status.HTTP_200_OK and 'Перекус' in [
+            tag['name'] for tag in response.json()
+        ], (
+            f'Проверьте, что при GET запросе {self.url_tags} перечитанный '
+            f'по таймауту справочник получает новый ETag'
+        )
+
+    def test_05_conditional_requires_shared_cache(self, settings):
+        with pytest.raises(ImproperlyConfigured):
+            check_conditional_cache()
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_table',
+        }}
+        check_conditional_cache()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_conditional_disabled(self, client, tags, recipes, settings):
+        settings.CONDITIONAL_RESPONSES = False
+        for url in (self.url_tags, self.url_recipes,
+                    f'{self.url_recipes}{recipes[0].id}/'):
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK and (
+                not response.has_header('ETag')
+            ), (
+                f'Проверьте, что при GET запросе {url} без '
+                f'CONDITIONAL_RESPONSES ETag не отдается'
+            )
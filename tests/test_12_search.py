@@ -0,0 +1,103 @@
+import pytest
+from rest_framework import status
+
+from tests.common import auth_client, recipe_data
+
+
+class Test12Search:
+
+    url_recipes = '/api/recipes/'
+
+    def create_recipe(self, client, tags, ingredients, name, text):
+        data = recipe_data(tags, ingredients)
+        data.update(name=name, text=text)
+        response = client.post(self.url_recipes, data=data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()['id']
+
+    def search(self, client, query):
+        response = client.get(self.url_recipes, {'search': query})
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {self.url_recipes}?search= '
+            f'возвращается статус {status.HTTP_200_OK}'
+        )
+        return response.json()['results']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_search_ranked(self, user, tags, ingredients):
+        client = auth_client(user)
+        apricots, milk, eggs = ingredients
+        omelette = self.create_recipe(
+            client, tags, [eggs, milk], 'Омлет', 'Взбить яйца с молоком'
+        )
+        pancakes = self.create_recipe(
+            client, tags, [milk], 'Блины', 'Тесто жиже, чем для омлета'
+        )
+        compote = self.create_recipe(
+            client, tags, [apricots], 'Компот', 'Сварить и остудить'
+        )
+        results = self.search(client, 'омлет')
+        assert [recipe['id'] for recipe in results] == [omelette, pancakes], (
+            'Проверьте, что поиск находит рецепты по названию и описанию, '
+            'а совпадение в названии выше совпадения в описании'
+        )
+        assert '<b>' in results[0]['search_snippet'], (
+            'Проверьте, что в search_snippet выделены найденные слова'
+        )
+        assert [
+            recipe['id'] for recipe in self.search(client, 'абрикосы')
+        ] == [compote], 'Проверьте, что поиск идет и по ингредиентам'
+        assert self.search(client, 'торт') == [], (
+            'Проверьте, что без совпадений поиск возвращает пустой список'
+        )
+        data = client.get(
+            self.url_recipes, {'search': 'омлет', 'pagination': 'cursor'}
+        ).json()
+        assert 'count' in data and [
+            recipe['id'] for recipe in data['results']
+        ] == [omelette, pancakes], (
+            'Проверьте, что с поиском курсорная пагинация не меняет '
+            'сортировку по релевантности'
+        )
+        response = client.get(self.url_recipes)
+        assert response.json()['results'][0]['search_snippet'] is None, (
+            'Проверьте, что без поиска search_snippet равен None'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_index_updates(self, user, tags, ingredients):
+        client = auth_client(user)
+        recipe_id = self.create_recipe(
+            client, tags, ingredients, 'Омлет', 'Взбить яйца'
+        )
+        data = recipe_data(tags, ingredients)
+        data.update(name='Запеканка', text='Запечь')
+        client.patch(f'{self.url_recipes}{recipe_id}/', data=data,
+                     format='json')
+        assert self.search(client, 'омлет') == [], (
+            'Проверьте, что после изменения рецепта старый текст не ищется'
+        )
+        assert len(self.search(client, 'запеканка')) == 1, (
+            'Проверьте, что после изменения рецепта ищется новый текст'
+        )
+        client.delete(f'{self.url_recipes}{recipe_id}/')
+        assert self.search(client, 'запеканка') == [], (
+            'Проверьте, что удаленный рецепт не находится поиском'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_snippet_escaped(self, user, tags, ingredients):
+        client = auth_client(user)
+        self.create_recipe(
+            client, tags, ingredients, 'Суп',
+            '<img src=x onerror=alert(1)> борщ вкусный'
+        )
+        snippet = self.search(client, 'борщ')[0]['search_snippet']
+        assert '<img' not in snippet and '&lt;img' in snippet, (
+            'Проверьте, что разметка из текста рецепта экранируется в '
+            'search_snippet'
+        )
+        assert '<b>борщ</b>' in snippet and snippet.count('<b>') == 1, (
+            'Проверьте, что в search_snippet тегами <b> выделены только '
+            'найденные слова'
+        )
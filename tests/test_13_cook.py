@@ -0,0 +1,77 @@
+import pytest
+from rest_framework import status
+
+from recipes import cook
+from tests.common import auth_client, recipe_data
+
+
+class Test13Cook:
+
+    url_recipes = '/api/recipes/'
+    url_cook = '/api/recipes/cook/'
+
+    def create_recipe(self, client, tags, ingredients):
+        response = client.post(
+            self.url_recipes, data=recipe_data(tags, ingredients),
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()['id']
+
+    def cook(self, client, ingredients, **params):
+        response = client.get(self.url_cook, {
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            **params
+        })
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {self.url_cook} возвращается '
+            f'статус {status.HTTP_200_OK}'
+        )
+        return [
+            (recipe['id'], recipe['coverage'], recipe['missing'])
+            for recipe in response.json()
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_cook_ranked_by_coverage(self, user, tags, ingredients):
+        client = auth_client(user)
+        apricots, milk, eggs = ingredients
+        omelette = self.create_recipe(client, tags, [milk, eggs])
+        pancakes = self.create_recipe(client, tags, ingredients)
+        compote = self.create_recipe(client, tags, [apricots])
+        assert self.cook(client, [milk, eggs]) == [
+            (omelette, 1.0, 0), (pancakes, 2 / 3, 1)
+        ], (
+            'Проверьте, что рецепты отсортированы по доле имеющихся '
+            'ингредиентов, а рецепты без совпадений не возвращаются'
+        )
+        assert self.cook(client, ingredients, limit=1) == [
+            (pancakes, 1.0, 0)
+        ], (
+            'Проверьте, что limit ограничивает число рецептов, а при равной '
+            'доле выше рецепт с большим числом совпавших ингредиентов'
+        )
+
+        index = cook.get_index()
+        data = recipe_data(tags, [apricots, milk])
+        client.patch(f'{self.url_recipes}{compote}/', data=data,
+                     format='json')
+        client.delete(f'{self.url_recipes}{omelette}/')
+        assert cook.get_index() is index, (
+            'Проверьте, что после изменения рецепта индекс обновляется '
+            'частично, а не перестраивается'
+        )
+        assert self.cook(client, [milk]) == [
+            (compote, 0.5, 1), (pancakes, 1 / 3, 2)
+        ], 'Проверьте, что индекс учитывает изменение и удаление рецептов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cook_validation(self, client):
+        for params in ({}, {'ingredients': 'abc'},
+                       {'ingredients': 1, 'limit': 0}):
+            response = client.get(self.url_cook, params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, (
+                f'Проверьте, что при GET запросе {self.url_cook} с '
+                f'параметрами {params} возвращается статус '
+                f'{status.HTTP_400_BAD_REQUEST}'
+            )
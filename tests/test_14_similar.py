@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+
+from recipes.models import Cart, Favorite
+
+
+class Test14SimilarRecipes:
+
+    def similar_ids(self, client, recipe):
+        url = f'/api/recipes/{recipe.id}/similar/'
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        return [item['id'] for item in response.json()]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_similar_recipes(self, client, user, another_user, admin,
+                                recipes):
+        first, second, third, fourth, fifth, sixth = recipes[:6]
+        readers = [
+            get_user_model().objects.create(
+                username=f'reader{number}', email=f'reader{number}@fake.fake'
+            ) for number in range(2)
+        ]
+        for person in (user, another_user, admin):
+            Favorite.objects.create(user=person, recipe=first)
+            Favorite.objects.create(user=person, recipe=second)
+        Favorite.objects.create(user=user, recipe=third)
+        Favorite.objects.create(user=another_user, recipe=third)
+        Cart.objects.create(user=admin, recipe=third)
+        Favorite.objects.create(user=user, recipe=fourth)
+        for person in readers:
+            Favorite.objects.create(user=person, recipe=fifth)
+            Favorite.objects.create(user=person, recipe=sixth)
+
+        call_command('refresh_similar_recipes', '--full')
+        assert self.similar_ids(client, first) == [second.id, third.id], (
+            'Проверьте, что похожие рецепты отсортированы по сходству, а '
+            'список покупок весит меньше избранного'
+        )
+        assert self.similar_ids(client, fourth) == [], (
+            'Проверьте, что рецепты с одним общим пользователем не '
+            'считаются похожими'
+        )
+        assert self.similar_ids(client, fifth) == [sixth.id]
+
+        Favorite.objects.update(created_at=timezone.now() - timedelta(days=3))
+        Cart.objects.update(created_at=timezone.now() - timedelta(days=3))
+        Favorite.objects.create(user=another_user, recipe=fourth)
+        Favorite.objects.filter(user=readers[1], recipe=sixth).delete()
+        call_command('refresh_similar_recipes')
+        assert fourth.id in self.similar_ids(client, first), (
+            'Проверьте, что без --full пересчитываются рецепты '
+            'пользователей с недавними добавлениями'
+        )
+        assert self.similar_ids(client, fifth) == [sixth.id], (
+            'Проверьте, что без --full рецепты остальных пользователей не '
+            'пересчитываются'
+        )
+        call_command('refresh_similar_recipes', '--full')
+        assert self.similar_ids(client, fifth) == [], (
+            'Проверьте, что полный пересчет учитывает удаления из избранного'
+        )
+        response = client.get('/api/recipes/100500/similar/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,70 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+
+from recipes.models import Ingredients, RecipeBucket
+from tests.common import auth_client, recipe_data
+
+
+class Test15AlikeRecipes:
+
+    url_recipes = '/api/recipes/'
+
+    def create_recipe(self, client, tags, ingredients):
+        response = client.post(
+            self.url_recipes, data=recipe_data(tags, ingredients),
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()['id']
+
+    def alike_ids(self, client, recipe_id):
+        url = f'{self.url_recipes}{recipe_id}/alike/'
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK, (
+            f'Проверьте, что при GET запросе {url} возвращается статус '
+            f'{status.HTTP_200_OK}'
+        )
+        return [recipe['id'] for recipe in response.json()]
+
+    def find_duplicates(self):
+        out = StringIO()
+        call_command('find_duplicate_recipes', stdout=out)
+        return out.getvalue()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_alike_and_duplicates(self, user, tags, ingredients):
+        client = auth_client(user)
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f'продукт {number}', measurement_unit='г')
+            for number in range(9)
+        )
+        products = list(Ingredients.objects.filter(
+            name__startswith='продукт'
+        ).order_by('id'))
+        original = self.create_recipe(client, tags[:1], products[:6])
+        copy = self.create_recipe(client, tags[:1], products[:6])
+        other = self.create_recipe(client, tags[1:2], products[4:])
+        self.create_recipe(client, tags[2:], ingredients)
+        assert RecipeBucket.objects.filter(recipe_id=original).exists(), (
+            'Проверьте, что при создании рецепта считаются корзины LSH'
+        )
+        assert self.alike_ids(client, original) == [copy], (
+            'Проверьте, что похожими считаются рецепты с близким составом'
+        )
+        output = self.find_duplicates()
+        assert f'1.00: {original} «' in output and f'~ {copy} «' in output, (
+            'Проверьте, что find_duplicate_recipes находит копии рецептов'
+        )
+        assert str(other) + ' «' not in output
+
+        data = recipe_data(tags[1:2], products[3:])
+        client.patch(f'{self.url_recipes}{copy}/', data=data, format='json')
+        assert self.alike_ids(client, original) == [], (
+            'Проверьте, что подпись пересчитывается при изменении рецепта'
+        )
+        assert 'Найдено похожих пар: 0' in self.find_duplicates()
+        response = client.get(f'{self.url_recipes}100500/alike/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND